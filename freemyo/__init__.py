@@ -0,0 +1,52 @@
+import importlib
+
+# Headless core of FreeMyo for use from your own code: packet decoding, stream buffering,
+# recording and offline processing, without the GUI toolkit, the BLE stack or the YAML config.
+# Names are imported from the myo_* modules on first use, so `import freemyo` costs almost
+# nothing and a script only pays for the pieces it touches:
+#   import freemyo
+#   session = freemyo.open_session('recordings/session-20240101-120000')
+#   samples = freemyo.decode_emg(notification_bytes)
+# Run from the repository root, or with it on PYTHONPATH. `python myo_bench.py startup` checks
+# the cold-start budget of these imports.
+
+_EXPORTS = {
+    # Decoding
+    'myo_protocol': ('SAMPLE_RATE', 'SAMPLES_PER_PACKET', 'EMG_HANDLES', 'CLASSIFIER_EVENT_TYPES', 'POSE_VALUES', 'ARM_VALUES',
+                     'XDIRECTION_VALUES', 'COMMAND', 'EMG_MODE', 'IMU_MODE', 'CLASSIFIER_MODE', 'SLEEP_MODE', 'UNLOCK_COMMAND',
+                     'decode_emg', 'decode_imu', 'decode_battery', 'decode_classifier', 'decode_filtered_50hz'),
+    # Buffering
+    'myo_streams': ('StreamHub', 'Subscription', 'Batch', 'STREAMS', 'CLASSIFIER_DTYPE', 'ONSET_DTYPE', 'classifier_record'),
+    'myo_pyramid': ('MinMaxPyramid', 'session_pyramid'),
+    # Recording
+    'myo_recording': ('SessionRecorder', 'SessionReader', 'open_session', 'find_sessions', 'new_session_path'),
+    'myo_compressed': ('CompressedSessionRecorder', 'CompressedSessionReader', 'compress_session', 'available_codecs'),
+    'myo_export': ('export_session',),
+    'myo_labels': ('LabelTrack',),
+    # Processing
+    'myo_dsp': ('DSPPipeline', 'StreamingFilter', 'FeatureExtractor', 'FEATURE_NAMES'),
+    'myo_calibration': ('Calibration', 'CalibrationSession', 'load_calibration', 'save_calibration'),
+    'myo_onset': ('OnsetDetector',),
+    'myo_spectrum': ('StreamingSpectrum',),
+    'myo_quantiles': ('ChannelSketch',),
+    'myo_correlation': ('StreamingCorrelation',),
+    'myo_gestures': ('TemplateMatcher', 'GestureFrames', 'load_templates'),
+    'myo_dataset': ('build_dataset', 'load_dataset'),
+    'myo_sim': ('SimulatedMyo',),
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module 'freemyo' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,455 @@
+import argparse, time
+import numpy as np
+
+# Micro-benchmarks for the pipeline stages.
+# Run e.g. `python myo_bench.py spectrum` and compare against the render budget of the GUI.
+
+SAMPLE_RATE = 200
+
+# Offline tools and library use must start without these; they belong to a live session or window
+HEADLESS_MODULES = ('freemyo', 'myo_protocol', 'myo_streams', 'myo_recording', 'myo_compressed', 'myo_export', 'myo_pyramid',
+                    'myo_batch', 'myo_dataset', 'myo_gestures')
+LIVE_ONLY_MODULES = ('bleak', 'dearpygui', 'yaml', 'scipy', 'asyncio', 'multiprocessing')
+STARTUP_BUDGET_MS = 40 # import time allowed on top of numpy's
+
+
+def synthetic_emg(seconds, channels=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(-128, 128, size=(int(seconds * SAMPLE_RATE), channels)).astype(np.float32)
+
+
+def bench_spectrum(args):
+    from myo_spectrum import StreamingSpectrum
+
+    data = synthetic_emg(args.seconds, channels=args.channels)
+    spectrum = StreamingSpectrum(channels=args.channels, frame_size=args.frame_size, hop_size=args.hop_size)
+    frame_budget = 1.0 / args.fps
+
+    # Feed it the way the GUI does: one BLE packet (2 samples) at a time
+    push_times = []
+    for start in range(0, len(data), 2):
+        t0 = time.perf_counter()
+        spectrum.push(data[start:start + 2])
+        push_times.append(time.perf_counter() - t0)
+    push_times = np.array(push_times)
+
+    refresh_times = []
+    for _ in range(50):
+        t0 = time.perf_counter()
+        spectrum.spectrogram_image(0).ravel().tolist()
+        spectrum.psd_db().tolist()
+        refresh_times.append(time.perf_counter() - t0)
+    refresh_times = np.array(refresh_times)
+
+    per_data_second = push_times.sum() / args.seconds
+    print(f"Spectrum: {args.channels} channels, frame {args.frame_size}, hop {args.hop_size}, {spectrum.frames_computed} frames")
+    print(f"  push per packet:   mean {1e6 * push_times.mean():8.1f} us   p99 {1e6 * np.percentile(push_times, 99):8.1f} us   max {1e6 * push_times.max():8.1f} us")
+    print(f"  panel refresh:     mean {1e3 * refresh_times.mean():8.3f} ms   max {1e3 * refresh_times.max():8.3f} ms")
+    print(f"  CPU per second of EMG: {1e3 * per_data_second:.3f} ms ({100 * per_data_second:.3f}% of one core)")
+    worst = push_times.max() + refresh_times.max()
+    verdict = "fits" if worst < frame_budget else "EXCEEDS"
+    print(f"  worst hop + refresh {1e3 * worst:.3f} ms {verdict} the {1e3 * frame_budget:.1f} ms frame budget at {args.fps} fps")
+
+
+def bench_pyramid(args):
+    from myo_pyramid import MinMaxPyramid
+
+    samples = int(args.hours * 3600 * SAMPLE_RATE)
+    pyramid = MinMaxPyramid(channels=args.channels)
+    rng = np.random.default_rng(0)
+    chunk = rng.integers(-128, 128, size=(SAMPLE_RATE * 60, args.channels)).astype(np.int8)
+    t0 = time.perf_counter()
+    for _ in range(0, samples, len(chunk)):
+        pyramid.push(chunk)
+    build_time = time.perf_counter() - t0
+
+    packet = chunk[:2]
+    t0 = time.perf_counter()
+    for _ in range(10000):
+        pyramid.push(packet)
+    push_time = (time.perf_counter() - t0) / 10000
+
+    print(f"Pyramid: {args.hours:g} h x {args.channels} channels, {len(pyramid.mins)} levels, built in {build_time:.2f} s")
+    print(f"  push per packet: {1e6 * push_time:.1f} us")
+    for span_seconds in (10, 60, 600, 3600, args.hours * 3600):
+        span = int(span_seconds * SAMPLE_RATE)
+        starts = rng.integers(0, max(1, pyramid.sample_count - span), size=200)
+        t0 = time.perf_counter()
+        for start in starts:
+            x, mins, maxs = pyramid.query(start, start + span, max_points=args.points)
+        elapsed = (time.perf_counter() - t0) / len(starts)
+        print(f"  query {span_seconds:>8g} s: {1e3 * elapsed:7.3f} ms, {len(x):5d} points")
+
+
+def bench_onset(args):
+    from myo_onset import OnsetDetector
+    from myo_protocol import decode_emg
+    from myo_sim import SimulatedMyo
+
+    sim = SimulatedMyo(seed=args.seed)
+    sim.add_random_bursts(args.seconds, args.bursts)
+    detector = OnsetDetector()
+    onsets = [] # (channel, sample, samples available when detected)
+    process_times = []
+    for handle, data in sim.packets(args.seconds):
+        samples = decode_emg(data)
+        t0 = time.perf_counter()
+        events = detector.process(samples)
+        process_times.append(time.perf_counter() - t0)
+        onsets.extend((e.channel, e.sample, detector.sample_count) for e in events if e.kind == 'ONSET')
+
+    # Detection latency: from the true burst start until the packet that triggered the event was received
+    tolerance = int(0.05 * SAMPLE_RATE)
+    latencies = []
+    matched = set()
+    for start, end, channels, _ in sim.bursts:
+        for channel in channels:
+            hits = [i for i, (c, sample, _) in enumerate(onsets) if c == channel and start - tolerance <= sample < end and i not in matched]
+            if hits:
+                matched.add(hits[0])
+                latencies.append(1000 * (onsets[hits[0]][2] - start) / SAMPLE_RATE)
+    expected = sum(len(channels) for _, _, channels, _ in sim.bursts)
+    latencies = np.array(latencies)
+    process_times = np.array(process_times)
+
+    print(f"Onset detection: {args.seconds:g} s simulated, {len(sim.bursts)} bursts on {expected} channel activations")
+    print(f"  detected {len(latencies)}/{expected}, {len(onsets) - len(matched)} false onsets")
+    if len(latencies):
+        print(f"  detection latency: median {np.median(latencies):.1f} ms   p95 {np.percentile(latencies, 95):.1f} ms   max {latencies.max():.1f} ms")
+    print(f"  processing per packet: mean {1e6 * process_times.mean():.1f} us   p99 {1e6 * np.percentile(process_times, 99):.1f} us")
+
+
+def bench_quantiles(args):
+    from myo_quantiles import ChannelSketch
+
+    data = synthetic_emg(60, channels=args.channels)
+    sketch = ChannelSketch(channels=args.channels, k=args.k, seed=0)
+    print(f"Quantile sketch: {args.channels} channels, k={args.k}")
+    # Cost per packet and sketch size should stay flat as the session grows
+    pushed = 0
+    for hours in args.hours:
+        target = int(hours * 3600 * SAMPLE_RATE)
+        while pushed < target:
+            sketch.push(data)
+            pushed += len(data)
+        t0 = time.perf_counter()
+        for start in range(0, 2000, 2):
+            sketch.push(data[start:start + 2])
+        push_time = (time.perf_counter() - t0) / 1000
+        pushed += 2000
+        t0 = time.perf_counter()
+        for _ in range(100):
+            sketch.quantiles([0.005, 0.5, 0.995])
+        query_time = (time.perf_counter() - t0) / 100
+        print(f"  after {hours:>6g} h: push per packet {1e6 * push_time:6.1f} us   query {1e3 * query_time:6.3f} ms   "
+              f"{sketch.size:5d} items/channel in {len(sketch.levels)} levels")
+
+    # Accuracy as rank error against the exact percentiles of a heavy-tailed signal
+    rng = np.random.default_rng(1)
+    signal = np.clip(rng.standard_t(3, size=(int(args.accuracy_seconds * SAMPLE_RATE), args.channels)) * 20, -128, 127)
+    sketch = ChannelSketch(channels=args.channels, k=args.k, seed=0)
+    for start in range(0, len(signal), 20):
+        sketch.push(signal[start:start + 20])
+    q = np.array([0.005, 0.05, 0.5, 0.95, 0.995])
+    ranks = np.array([[np.mean(signal[:, c] <= value) for value in row] for c, row in enumerate(sketch.quantiles(q))])
+    errors = np.abs(ranks - q)
+    print(f"  rank error over {args.accuracy_seconds:g} s: mean {100 * errors.mean():.2f}%   max {100 * errors.max():.2f}%")
+
+
+def bench_correlation(args):
+    from myo_correlation import StreamingCorrelation
+
+    print(f"Correlation: {args.seconds:g} s of EMG in batches of {args.batch} samples")
+    for armbands in args.armbands:
+        channels = 8 * armbands
+        data = synthetic_emg(args.seconds, channels=channels).astype(np.float64)
+        batched = StreamingCorrelation(channels=channels)
+        t0 = time.perf_counter()
+        for start in range(0, len(data), args.batch):
+            batched.push(data[start:start + args.batch])
+        batch_time = time.perf_counter() - t0
+
+        # Reference: the same update applied one sample at a time, on a slice to keep it quick
+        per_sample = StreamingCorrelation(channels=channels)
+        reference = data[:min(len(data), 2000)]
+        t0 = time.perf_counter()
+        for start in range(len(reference)):
+            per_sample.push(reference[start:start + 1])
+        sample_time = (time.perf_counter() - t0) * len(data) / len(reference)
+
+        t0 = time.perf_counter()
+        for _ in range(100):
+            batched.correlation()
+        matrix_time = (time.perf_counter() - t0) / 100
+        batches = -(-len(data) // args.batch)
+        print(f"  {armbands} armband(s), {channels}x{channels}: {1e6 * batch_time / batches:7.1f} us per batch "
+              f"({100 * batch_time / args.seconds:.3f}% of one core), per-sample updates {sample_time / batch_time:5.1f}x slower, "
+              f"correlation() {1e6 * matrix_time:.1f} us")
+
+
+def bench_fanout(args):
+    import asyncio
+    from myo_streams import StreamHub
+
+    async def run(subscribers, slow):
+        hub = StreamHub()
+        received = [0] * subscribers
+        def make_handler(i):
+            def handler(batch):
+                received[i] += len(batch.data)
+            return handler
+        for i in range(subscribers):
+            hub.subscribe('emg', make_handler(i), maxsize=args.queue_size)
+        if slow:
+            async def slow_handler(batch):
+                await asyncio.sleep(0.01)
+            slow_subscription = hub.subscribe('emg', slow_handler, maxsize=args.queue_size)
+
+        data = np.zeros((2, 8), dtype=np.int8)
+        timestamps = np.zeros(2)
+        publish_time = 0.0
+        start = time.perf_counter()
+        for i in range(args.batches):
+            t0 = time.perf_counter()
+            hub.publish('emg', timestamps, data)
+            publish_time += time.perf_counter() - t0
+            if i % args.yield_every == 0:
+                await asyncio.sleep(0) # let the subscriber tasks run, like the GUI's event loop does
+        while any(subscription.queue for subscriptions in hub.subscriptions.values() for subscription in subscriptions
+                  if not slow or subscription is not slow_subscription):
+            await asyncio.sleep(0)
+        total = time.perf_counter() - start
+        dropped = slow_subscription.dropped if slow else 0
+        hub.close()
+        return publish_time / args.batches, total / args.batches, min(received) == 2 * args.batches, dropped
+
+    print(f"Fan-out: {args.batches} EMG packet batches, queue size {args.queue_size}")
+    for subscribers in args.subscribers:
+        publish, end_to_end, complete, _ = asyncio.run(run(subscribers, slow=False))
+        print(f"  {subscribers:3d} subscribers: publish {1e6 * publish:6.2f} us/batch ({1e6 * publish / subscribers:5.2f} us per subscriber), "
+              f"delivered {1e6 * end_to_end / subscribers:5.2f} us per subscriber per batch, {'all delivered' if complete else 'INCOMPLETE'}")
+    publish, _, complete, dropped = asyncio.run(run(args.subscribers[0], slow=True))
+    print(f"  with a slow subscriber added: publish {1e6 * publish:6.2f} us/batch, others {'all delivered' if complete else 'INCOMPLETE'}, "
+          f"slow subscriber dropped {dropped} batches")
+
+
+def bench_compression(args):
+    import os, tempfile
+    from myo_compressed import CompressedSessionRecorder, CompressedSessionReader, available_codecs
+    from myo_recording import open_session
+
+    if args.session:
+        session = open_session(args.session)
+        timestamps, emg = np.asarray(session.timestamps), np.asarray(session.emg)
+        source = args.session
+    else:
+        from myo_sim import SimulatedMyo
+        sim = SimulatedMyo(seed=0)
+        sim.add_random_bursts(args.seconds, int(args.seconds / 4))
+        emg = sim.samples(args.seconds)
+        timestamps = np.arange(len(emg)) / SAMPLE_RATE
+        source = f"{args.seconds:g} s simulated"
+    raw_bytes = emg.nbytes + timestamps.nbytes
+    seconds = len(emg) / SAMPLE_RATE
+    print(f"Compression: {source}, {len(emg)} samples, {raw_bytes / 1e6:.1f} MB raw, chunks of {args.chunk_seconds:g} s")
+
+    rng = np.random.default_rng(0)
+    for codec in args.codecs or available_codecs():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'session')
+            # Replay in packet-sized batches, as the GUI writes them; close() waits for the writer thread
+            t0 = time.perf_counter()
+            recorder = CompressedSessionRecorder(path, codec=codec, chunk_seconds=args.chunk_seconds)
+            for start in range(0, len(emg), 10):
+                recorder.write(timestamps[start:start + 10], emg[start:start + 10])
+            recorder.close()
+            write_time = time.perf_counter() - t0
+            compressed_bytes = os.path.getsize(os.path.join(path, 'data.chunks')) + os.path.getsize(os.path.join(path, 'data.index'))
+
+            reader = CompressedSessionReader(path, cache_chunks=0)
+            t0 = time.perf_counter()
+            decoded = np.asarray(reader.emg)
+            read_time = time.perf_counter() - t0
+            assert np.array_equal(decoded, emg), "round trip mismatch"
+            window = SAMPLE_RATE
+            starts = rng.integers(0, max(1, len(emg) - window), size=200)
+            t0 = time.perf_counter()
+            for start in starts:
+                reader.read(int(start), int(start) + window)
+            random_time = (time.perf_counter() - t0) / len(starts)
+            reader.close()
+        print(f"  {codec:5s} ratio {raw_bytes / compressed_bytes:5.2f}x   write {raw_bytes / 1e6 / write_time:7.1f} MB/s "
+              f"({seconds / write_time:7.0f}x real time)   read {raw_bytes / 1e6 / read_time:7.1f} MB/s   "
+              f"random 1 s window {1e3 * random_time:.3f} ms")
+
+
+def bench_dtw(args):
+    from myo_gestures import GestureTemplate, TemplateMatcher, resample
+
+    rng = np.random.default_rng(0)
+    length = int(args.template_seconds * args.frame_rate)
+    frames = int(args.seconds * args.frame_rate)
+    print(f"DTW templates: {length}-frame templates ({args.template_seconds:g} s), {args.seconds:g} s of 8-channel frames at "
+          f"{args.frame_rate:g} Hz, warp {args.warp:g}")
+    for count in args.templates:
+        # Smooth random activation patterns, with the gestures occurring time-warped in a noisy stream
+        shapes = np.abs(np.cumsum(rng.normal(0, 1, (count, length, 8)), axis=1)) / np.sqrt(length)
+        threshold = 0.05 * float((shapes ** 2).sum(axis=-1).mean())
+        templates = [GestureTemplate(f"G{i}", shape, threshold) for i, shape in enumerate(shapes)]
+        stream = np.abs(rng.normal(0, 0.1, (frames, 8)))
+        position = int(rng.integers(length, 3 * length))
+        while True:
+            occurrence = resample(shapes[rng.integers(count)], int(length * rng.uniform(0.85, 1.15)))
+            if position + len(occurrence) > frames:
+                break
+            stream[position:position + len(occurrence)] += occurrence
+            position += len(occurrence) + int(rng.integers(length, 3 * length))
+
+        results, reported = {}, {}
+        for prune in (True, False):
+            matcher = TemplateMatcher(templates, warp=args.warp, prune=prune)
+            # Unpruned matching is slow, so time it on a slice and scale up
+            part = stream if prune else stream[:max(2 * length, frames // 10)]
+            t0 = time.perf_counter()
+            reported[prune] = [match for start in range(0, len(part), args.batch) for match in matcher.push(part[start:start + args.batch])]
+            results[prune] = ((time.perf_counter() - t0) * frames / len(part), matcher.stats)
+        # Pruning must never change what push() reports: replay the slice pruned and compare the matches
+        matcher = TemplateMatcher(templates, warp=args.warp)
+        reported[True] = [match for start in range(0, len(part), args.batch) for match in matcher.push(part[start:start + args.batch])]
+        same = len(reported[True]) == len(reported[False]) and all(
+            (a.name, a.frame, a.length) == (b.name, b.frame, b.length) and np.isclose(a.distance, b.distance)
+            for a, b in zip(reported[True], reported[False]))
+        if not same:
+            raise RuntimeError(f"Pruned and unpruned matching report different gestures with {count} templates")
+        elapsed, stats = results[True]
+        print(f"  {count:3d} templates: {1e6 * elapsed / frames:8.1f} us per frame, {stats['evaluated'] / elapsed:10.0f} templates/s "
+              f"({100 * elapsed / args.seconds:.2f}% of one core), LB_Keogh pruned {100 * stats['lb_pruned'] / stats['evaluated']:.1f}%, "
+              f"abandoned {100 * stats['abandoned'] / stats['evaluated']:.1f}%, {stats['matches']} matches, "
+              f"{results[False][0] / elapsed:.1f}x faster than full DTW")
+
+
+def bench_startup(args):
+    import os, statistics, subprocess, sys
+
+    def import_profile(module):
+        # (cumulative ms of importing `module`, names of every module it loaded) from python -X importtime
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        cumulative, loaded = 0.0, set()
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, total, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            loaded.add(name)
+            if name == module:
+                cumulative = int(total) / 1000
+        return cumulative, loaded
+
+    # Rounds interleave every module with the numpy baseline so drifting machine load hits all of
+    # them alike; the first round only warms the bytecode and file caches
+    modules = ['numpy'] + list(args.modules)
+    profiles = {module: [] for module in modules}
+    for round in range(args.runs + 1):
+        for module in modules:
+            profile = import_profile(module)
+            if round:
+                profiles[module].append(profile)
+    # Noise only ever adds time, so the fastest run is the stable estimate and the one gated on
+    baseline = min(cumulative for cumulative, _ in profiles['numpy'])
+    print(f"Cold-start import time, fastest of {args.runs} runs (python -X importtime). numpy alone: {baseline:.1f} ms, "
+          f"budget: {args.budget_ms:g} ms on top of it")
+    failed = False
+    for module in args.modules:
+        if profiles[module][0][0] is None:
+            failed = True
+            print(f"  {module:16s} import failed: {profiles[module][0][1]}")
+            continue
+        total = min(cumulative for cumulative, _ in profiles[module])
+        median = statistics.median(cumulative for cumulative, _ in profiles[module])
+        loaded = profiles[module][0][1]
+        extra = total - baseline if 'numpy' in loaded else total
+        live_only = sorted(name for name in LIVE_ONLY_MODULES if name in loaded)
+        over = extra > args.budget_ms
+        failed |= over or bool(live_only)
+        print(f"  {module:16s} {total:7.1f} ms  (+{max(extra, 0):5.1f} ms, median {median:.1f} ms){'  OVER BUDGET' if over else ''}"
+              f"{'  loads ' + ', '.join(live_only) if live_only else ''}")
+    if failed:
+        print("Headless imports exceed the startup budget")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FreeMyo pipeline benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    spectrum_parser = subparsers.add_parser('spectrum', help="incremental PSD/spectrogram")
+    spectrum_parser.add_argument('--seconds', type=float, default=60)
+    spectrum_parser.add_argument('--channels', type=int, default=8)
+    spectrum_parser.add_argument('--frame-size', type=int, default=128)
+    spectrum_parser.add_argument('--hop-size', type=int, default=16)
+    spectrum_parser.add_argument('--fps', type=float, default=60)
+    spectrum_parser.set_defaults(func=bench_spectrum)
+
+    pyramid_parser = subparsers.add_parser('pyramid', help="zoomable min/max session history")
+    pyramid_parser.add_argument('--hours', type=float, default=4)
+    pyramid_parser.add_argument('--channels', type=int, default=8)
+    pyramid_parser.add_argument('--points', type=int, default=1000, help="plot width in points")
+    pyramid_parser.set_defaults(func=bench_pyramid)
+
+    onset_parser = subparsers.add_parser('onset', help="activation onset detection latency on simulated bursts")
+    onset_parser.add_argument('--seconds', type=float, default=120)
+    onset_parser.add_argument('--bursts', type=int, default=40)
+    onset_parser.add_argument('--seed', type=int, default=0)
+    onset_parser.set_defaults(func=bench_onset)
+
+    quantiles_parser = subparsers.add_parser('quantiles', help="streaming quantile sketch cost and accuracy")
+    quantiles_parser.add_argument('--hours', type=float, nargs='+', default=[0.1, 1, 10])
+    quantiles_parser.add_argument('--channels', type=int, default=8)
+    quantiles_parser.add_argument('-k', type=int, default=200)
+    quantiles_parser.add_argument('--accuracy-seconds', type=float, default=600)
+    quantiles_parser.set_defaults(func=bench_quantiles)
+
+    correlation_parser = subparsers.add_parser('correlation', help="live inter-channel correlation matrix for one or more armbands")
+    correlation_parser.add_argument('--seconds', type=float, default=60)
+    correlation_parser.add_argument('--armbands', type=int, nargs='+', default=[1, 2, 4, 8])
+    correlation_parser.add_argument('--batch', type=int, default=10, help="samples per processed batch")
+    correlation_parser.set_defaults(func=bench_correlation)
+
+    fanout_parser = subparsers.add_parser('fanout', help="stream hub overhead per subscriber")
+    fanout_parser.add_argument('--batches', type=int, default=20000)
+    fanout_parser.add_argument('--subscribers', type=int, nargs='+', default=[1, 4, 16, 64])
+    fanout_parser.add_argument('--queue-size', type=int, default=256)
+    fanout_parser.add_argument('--yield-every', type=int, default=10, help="batches published between event loop turns")
+    fanout_parser.set_defaults(func=bench_fanout)
+
+    compression_parser = subparsers.add_parser('compression', help="compressed recording ratio and throughput")
+    compression_parser.add_argument('--session', help="replay this recorded session instead of simulated EMG")
+    compression_parser.add_argument('--seconds', type=float, default=600, help="length of the simulated session")
+    compression_parser.add_argument('--codecs', nargs='+', help="codecs to compare (default: all available)")
+    compression_parser.add_argument('--chunk-seconds', type=float, default=10)
+    compression_parser.set_defaults(func=bench_compression)
+
+    dtw_parser = subparsers.add_parser('dtw', help="custom gesture template matching with pruned DTW")
+    dtw_parser.add_argument('--templates', type=int, nargs='+', default=[6, 24, 48], help="template counts to compare")
+    dtw_parser.add_argument('--template-seconds', type=float, default=0.8)
+    dtw_parser.add_argument('--frame-rate', type=float, default=200, help="frames per second (200 for unreduced EMG, 50 for the default envelope)")
+    dtw_parser.add_argument('--warp', type=float, default=0.2)
+    dtw_parser.add_argument('--seconds', type=float, default=60)
+    dtw_parser.add_argument('--batch', type=int, default=4, help="frames per push")
+    dtw_parser.set_defaults(func=bench_dtw)
+
+    startup_parser = subparsers.add_parser('startup', help="cold-start import time of the headless modules against a budget")
+    startup_parser.add_argument('--modules', nargs='+', default=list(HEADLESS_MODULES))
+    startup_parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS, help="import time allowed on top of numpy")
+    startup_parser.add_argument('--runs', type=int, default=9)
+    startup_parser.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
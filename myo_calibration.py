@@ -0,0 +1,159 @@
+import json, os, time
+import numpy as np
+
+# Per-user / per-placement calibration of the raw int8 EMG.
+# A calibration session streams samples through per-channel Welford statistics and exact 256-bin
+# value histograms (the data are int8, so quantiles are exact in constant memory), in two phases:
+#   rest - baseline (mean) and noise floor (95th percentile of |x - baseline|)
+#   mvc  - maximum voluntary contraction reference (99th percentile of |x - baseline|)
+# The result is a single per-channel scale/offset that maps raw samples to fractions of MVC,
+# applied to each batch in one vectorised multiply-add.
+
+PHASES = ('rest', 'mvc')
+NOISE_FLOOR_QUANTILE = 95
+MVC_QUANTILE = 99
+
+
+class RunningStats():
+    # Welford / Chan et al. batch-merged mean and variance per channel
+    def __init__(self, channels):
+        self.count = 0
+        self.mean = np.zeros(channels)
+        self.m2 = np.zeros(channels)
+
+    def push(self, samples):
+        n = len(samples)
+        if n == 0:
+            return
+        batch_mean = samples.mean(axis=0)
+        batch_m2 = ((samples - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self):
+        return self.m2 / max(self.count - 1, 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+class Int8Histogram():
+    def __init__(self, channels):
+        self.channels = channels
+        self.counts = np.zeros((channels, 256), dtype=np.int64)
+
+    def push(self, samples):
+        values = np.asarray(samples).astype(np.int16) + 128 # 0..255
+        offsets = np.arange(self.channels) * 256
+        self.counts += np.bincount((values + offsets).ravel(), minlength=self.channels * 256).reshape(self.channels, 256)
+
+    def deviation_quantile(self, center, q):
+        # q-th percentile of |x - center| per channel
+        values = np.arange(-128, 128, dtype=np.float64)
+        result = np.zeros(self.channels)
+        for channel in range(self.channels):
+            deviations = np.abs(values - center[channel])
+            order = np.argsort(deviations)
+            cumulative = np.cumsum(self.counts[channel][order])
+            if cumulative[-1] == 0:
+                continue
+            index = np.searchsorted(cumulative, q / 100 * cumulative[-1])
+            result[channel] = deviations[order][min(index, 255)]
+        return result
+
+
+class Calibration():
+    def __init__(self, baseline, noise_floor, mvc, serial_number='', created=None, samples=None):
+        self.baseline = np.asarray(baseline, dtype=np.float64)
+        self.noise_floor = np.asarray(noise_floor, dtype=np.float64)
+        self.mvc = np.asarray(mvc, dtype=np.float64)
+        self.serial_number = serial_number
+        self.created = created if created is not None else time.time()
+        self.samples = samples or {}
+        # Normalised = raw * scale + offset = (raw - baseline) / mvc amplitude
+        amplitude = np.maximum(self.mvc, np.maximum(self.noise_floor, 1.0))
+        self.scale = (1.0 / amplitude).astype(np.float32)
+        self.offset = (-self.baseline / amplitude).astype(np.float32)
+
+    def apply(self, samples):
+        return np.asarray(samples, dtype=np.float32) * self.scale + self.offset
+
+    def to_dict(self):
+        return {
+            'serial_number': self.serial_number,
+            'created': self.created,
+            'baseline': self.baseline.tolist(),
+            'noise_floor': self.noise_floor.tolist(),
+            'mvc': self.mvc.tolist(),
+            'samples': self.samples,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['baseline'], data['noise_floor'], data['mvc'], serial_number=data.get('serial_number', ''),
+                   created=data.get('created'), samples=data.get('samples'))
+
+
+class CalibrationSession():
+    def __init__(self, channels=8, serial_number=''):
+        self.channels = channels
+        self.serial_number = serial_number
+        self.phase = None
+        self.stats = {phase: RunningStats(channels) for phase in PHASES}
+        self.histograms = {phase: Int8Histogram(channels) for phase in PHASES}
+
+    def start_phase(self, phase):
+        if phase not in PHASES:
+            raise ValueError(f"Unknown calibration phase {phase}, expected one of {', '.join(PHASES)}")
+        self.phase = phase
+
+    def finish_phase(self):
+        self.phase = None
+
+    def push(self, samples):
+        # Raw int8 samples (n, channels); ignored between phases
+        if self.phase is None or len(samples) == 0:
+            return
+        samples = np.asarray(samples)
+        self.stats[self.phase].push(samples.astype(np.float64))
+        self.histograms[self.phase].push(samples)
+
+    @property
+    def complete(self):
+        return all(self.stats[phase].count > 0 for phase in PHASES)
+
+    def result(self):
+        if not self.complete:
+            raise RuntimeError("Both the rest and mvc phases need samples before calibrating")
+        baseline = self.stats['rest'].mean
+        noise_floor = self.histograms['rest'].deviation_quantile(baseline, NOISE_FLOOR_QUANTILE)
+        mvc = self.histograms['mvc'].deviation_quantile(baseline, MVC_QUANTILE)
+        return Calibration(baseline, noise_floor, mvc, serial_number=self.serial_number,
+                           samples={phase: int(self.stats[phase].count) for phase in PHASES})
+
+
+def calibration_path(directory, serial_number):
+    return os.path.join(directory, f"{serial_number or 'unknown'}.json")
+
+
+def save_calibration(calibration, directory):
+    os.makedirs(directory, exist_ok=True)
+    path = calibration_path(directory, calibration.serial_number)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(calibration.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_calibration(directory, serial_number):
+    path = calibration_path(directory, serial_number)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return Calibration.from_dict(json.load(f))
@@ -1,178 +1,69 @@
-import asyncio,yaml, struct
-from bleak import BleakClient
-
-CLASSIFIER_EVENT_TYPES = {
-    1: 'ARM_SYNCED',
-    2: 'ARM_UNSYNCED',
-    3: 'POSE',
-    4: 'UNLOCKED',
-    5: 'LOCKED',
-    6: 'SYNC_FAILED',
-    7: 'UNKNOWN', # I've only seen this once
-}
-
-ARM_VALUES = {
-    0: 'UNKNOWN',
-    1: 'RIGHT',
-    2: 'LEFT',
-    255: 'UNKNOWN',
-}
-
-POSE_VALUES = {
-    0: 'REST',
-    1: 'FIST',
-    2: 'WAVE_IN',
-    3: 'WAVE_OUT',
-    4: 'FINGERS_SPREAD',
-    5: 'DOUBLE_TAP',
-    255: 'UNKNOWN'
-}
-
-XDIRECTION_VALUES = {
-    1: 'TOWARD_WRIST',
-    2: 'TOWARD_ELBOW',
-    255: 'UNKNOWN'
-}
-
-
-
-
-COMMAND = {
-    'SET_EMG_IMU_MODE':   1, # Set EMG and IMU and Classifier modes
-    'VIBRATE':            3, # Vibrate
-    'DEEP_SLEEP':         4, # Put Myo into deep sleep
-    'LED':                6, # Set LED mode
-    'EXTENDED_VIBRATION': 7, # Extended vibrate
-    'SET_SLEEP_MODE':     9, # Set sleep mode
-    'UNLOCK':            10, # Unlock Myo
-    'USER_ACTION':       11, # Notify user that an action has been recognized / confirmed
-}  
-
-# Myo samples at a constant rate of 200 HZ
-EMG_MODE = {
-    'OFF':           0, # Do not send EMG data
-    'FILTERED_50HZ': 1, # Undocumented filtered 50Hz
-    'FILTERED':      2, # Send filtered EMG data
-    'RAW':           3, # Send raw (unfiltered) EMG data
-}
-
-IMU_MODE = {
-    'OFF':           0, # Do not send IMU data or events
-    'SEND_DATA':     1, # Send IMU data streams (accelerometer, gyroscope, and orientation)
-    'SEND_EVENTS':   2, # Send motion events detected by the IMU (e.g. taps)
-    'SEND_ALL':      3, # Send both IMU data streams and motion events
-    'SEND_RAW':      4, # Send raw IMU data streams 
-}
-
-VIBRATION_DURATION = {
-    'NONE':         0, # Do not vibrate
-    'SHORT':        1, # Vibrate for a short amount of time
-    'MEDIUM':       2, # Vibrate for a medium amount of time
-    'LONG':         3, # Vibrate for a long amount of time
-}
-
-SLEEP_MODE = {
-    'NORMAL':        0, # Normal sleep mode; Myo will sleep after a period of inactivity
-    'NEVER_SLEEP':   1, # Never go to sleep
-}
-
-UNLOCK_COMMAND = {
-    'UNLOCK_RELOCK': 0, # Unlock then re-lock immediately
-    'UNLOCK_TIMED':  1, # Unlock now and re-lock after a fixed timeout
-    'UNLOCK_HOLD':   2, # Unlock now and remain unlocked until a lock command is received
-}
-
-CLASSIFIER_MODE = {
-    'DISABLED':      0, # Disable and reset the internal state of the onboard classifier
-    'ENABLED':       1, # Send classifier events (poses and arm events)
-}
-
+import asyncio, struct, time
+import numpy as np
+from myo_protocol import (COMMAND, EMG_MODE, IMU_MODE, CLASSIFIER_MODE, SLEEP_MODE, UNLOCK_COMMAND, decode_battery,
+                          decode_classifier, decode_emg, decode_filtered_50hz, decode_imu)
+from myo_streams import StreamHub, classifier_record
 
+# Decoded data is published to these streams; the printers below are just the default subscribers
+streams = StreamHub()
 
 
 def handle_battery_notification(data):
-    characteristic = 'Battery Level'
-    print(f"{characteristic}: {int.from_bytes(data, 'little')}")
+    streams.publish('battery', [time.perf_counter()], np.array([decode_battery(data)], dtype=np.uint8))
 
 def handle_classifier_indication(data):
-    event_id, value_id, x_direction_id, _, _, _ = struct.unpack('<6B', data) #TODO what are the 3 bytes at the end?
-    classifier_event = CLASSIFIER_EVENT_TYPES[event_id]
-    classifier_value = None
-    x_direction = None
-    match classifier_event:
-        case 'ARM_SYNCED':
-            classifier_value = ARM_VALUES[value_id]
-            x_direction = XDIRECTION_VALUES[x_direction_id]
-        case 'ARM_UNSYNCED':
-            pass
-        case 'POSE':
-            classifier_value = POSE_VALUES[value_id]
-        case 'UNLOCKED':
-            pass
-        case 'LOCKED':
-            pass
-        case 'SYNC_FAILED':
-            pass
-        case _:
-            classifier_event = "Unknown Event"
-    print_value = f"{classifier_event} >>> "
-    print_value += f"{classifier_value} " if classifier_value else ""
-    print_value += f"-- {x_direction}" if x_direction else ""
-    print(print_value) 
+    classifier_event, classifier_value, x_direction = decode_classifier(data)
+    streams.publish('classifier', [time.perf_counter()], classifier_record(classifier_event, classifier_value, x_direction))
 
 def ble_notification_callback(handle, data):
+    received_at = time.perf_counter()
     match handle:
         case 16: # battery notifications
             handle_battery_notification(data)     
-        case 28: # IMU data
-            values = struct.unpack('10h', data)
-            quat = values[:4]
-            acc  = values[4:7]
-            gyro = values[7:10]
-            print(f"IMU: quat: {quat} acc: {acc} gyro: {gyro}")          
+        case 28: # IMU data, quat (4), acc (3), gyro (3)
+            streams.publish('imu', [received_at], decode_imu(data))
         case 34: # classifier notifications
             handle_classifier_indication(data)
         case 38: # undocumented filtered 50hz emg mode
-            values = list(struct.unpack('<8h', data[:16]))
-            emg = values[:8]
-            intensity_candidate = int(data[15]) # This extra byte seems to be a sort of measure of intensity.
-                                                # Or a measure of how much the sensor is stretched apart.
-                                                # Maybe its the latter trying to be the former?
-                                                # The values vary from 0 to 7 and seem to rise with intensity of pose.
-                                                # This is really only noticeable when making a fist (perhaps because all the muscles tense)
+            emg, intensity_candidate = decode_filtered_50hz(data)
             print(f"EMG: {emg} - Intensity: {intensity_candidate}")
-        case 42: # EMG 0
-            emg0 = struct.unpack('<16b', data)
-            print(f"EMG 0: {emg0}")
-            # emg1 = struct.unpack('<8b', data[:8])
-            # emg2 = struct.unpack('<8b', data[8:])
-            # print(emg1)
-            # print(emg2)
-        case 45: # EMG 1
-            emg1 = struct.unpack('<16b', data) 
-            print(f"EMG 1: {emg1}")        
-            # emg3 = struct.unpack('<8b', data[:8])
-            # emg4 = struct.unpack('<8b', data[8:])
-            # print(emg3)
-            # print(emg4)
-        case 48: # EMG 2
-            emg2 = struct.unpack('<16b', data)    
-            print(f"EMG 2: {emg2}")   
-            # emg5 = struct.unpack('<8b', data[:8])
-            # emg6 = struct.unpack('<8b', data[8:])
-            # print(emg5)
-            # print(emg6)
-        case 51: # EMG 3
-            emg3 = struct.unpack('<16b', data)  
-            print(f"EMG 3: {emg3}")   
-            # emg7 = struct.unpack('<8b', data[:8])
-            # emg8 = struct.unpack('<8b', data[8:])
-            # print(emg7)
-            # print(emg8)
+        case 42 | 45 | 48 | 51: # EMG 0-3, two consecutive 8 channel samples each
+            streams.publish('emg', [received_at - 0.005, received_at], decode_emg(data))
         case _:
             print(f"Unknown Characteristic: Handle: {handle} Data: {data}")
 
 
+def print_emg(batch):
+    for sample in batch.data:
+        print(f"EMG: {sample.tolist()}")
+
+def print_imu(batch):
+    for values in batch.data:
+        print(f"IMU: quat: {tuple(values[:4].tolist())} acc: {tuple(values[4:7].tolist())} gyro: {tuple(values[7:10].tolist())}")
+
+def print_classifier(batch):
+    for record in batch.data:
+        print_value = f"{record['event']} >>> "
+        print_value += f"{record['value']} " if record['value'] else ""
+        print_value += f"-- {record['x_direction']}" if record['x_direction'] else ""
+        print(print_value)
+
+def print_battery(batch):
+    for level in batch.data:
+        print(f"Battery Level: {int(level)}")
+
+def print_rssi(batch):
+    for rssi in batch.data:
+        print(f"Signal Strength: {int(rssi)} dBm")
+
+def subscribe_printers():
+    streams.subscribe('emg', print_emg, coalesce=True)
+    streams.subscribe('imu', print_imu, coalesce=True)
+    streams.subscribe('classifier', print_classifier)
+    streams.subscribe('battery', print_battery)
+    streams.subscribe('rssi', print_rssi)
+
+
 async def list_ble_characteristics(client):
     for service in client.services:
         print("[Service] {0}: {1}".format(service.uuid, service.description))
@@ -195,6 +86,9 @@ async def list_ble_characteristics(client):
     
 
 async def main():
+    # Only a live session needs the config parser and the BLE stack
+    import yaml
+    from bleak import BleakClient
     with open("myo_config.yaml", "r") as stream:
         try:
             device_config = yaml.safe_load(stream)
@@ -202,6 +96,8 @@ async def main():
             print(f"Error reading config file: {e}")
             return
 
+    subscribe_printers()
+
     ble_device_uuid = device_config['myo_armband']['device_uuid']
     print(f"Connecting to {ble_device_uuid}")
 
@@ -210,7 +106,7 @@ async def main():
 
         rssi = await client.get_rssi()
         print(f"Connected.")
-        print(f"Signal Strength: {rssi} dBm")
+        streams.publish('rssi', [time.perf_counter()], np.array([rssi], dtype=np.int16))
 
 
         # Get Device Manufacturer #################################################################
@@ -324,7 +220,7 @@ async def main():
         battery_level_characteristic = device_config['myo_armband']['characteristics']['battery_level']
         battery_level_char = await client.read_gatt_char(battery_level_characteristic)
         battery_level = int.from_bytes(battery_level_char, 'big')
-        print(f"Battery Level: {battery_level}") # Get initial battery level
+        streams.publish('battery', [time.perf_counter()], np.array([battery_level], dtype=np.uint8)) # Get initial battery level
         await client.start_notify(battery_level_characteristic, ble_notification_callback) # subscribe to battery level notifications
         #########################################################################################
 
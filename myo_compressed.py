@@ -0,0 +1,326 @@
+import argparse, os, queue, sys, threading, time, zlib, lzma
+from collections import OrderedDict
+import numpy as np
+from myo_recording import SessionRecorder, SessionReader, find_sessions, open_session
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    from compression import zstd # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+# Compressed session storage. Instead of emg.bin/timestamps.bin a session holds
+#   data.chunks   independently compressed chunks of chunk_samples samples, back to back
+#   data.index    one INDEX_DTYPE record per chunk, appended once the chunk is fully written
+# Before compression each chunk is delta-encoded: EMG per channel modulo 256 and stored
+# channel-major, timestamps as differences of their float64 bit patterns modulo 2^64 and
+# byte-shuffled. Both are lossless and turn slowly varying signals into runs of small bytes.
+# Chunks are compressed and written by a background thread so ingest only ever appends to
+# a buffer, and readers decode just the chunks a slice touches.
+
+STORAGE = 'compressed'
+CHUNKS_FILE = 'data.chunks'
+INDEX_FILE = 'data.index'
+DEFAULT_CODEC = 'zlib'
+DEFAULT_CHUNK_SECONDS = 10
+
+INDEX_DTYPE = np.dtype([('offset', '<i8'), ('length', '<i8'), ('first_sample', '<i8'), ('samples', '<i4'),
+                        ('first_time', '<f8'), ('last_time', '<f8')])
+
+
+def _zstd_codec(level):
+    if hasattr(zstd, 'ZstdCompressor') and hasattr(zstd, 'ZstdDecompressor') and not hasattr(zstd, 'compress'):
+        compressor, decompressor = zstd.ZstdCompressor(level=level), zstd.ZstdDecompressor()
+        return compressor.compress, decompressor.decompress
+    return (lambda data: zstd.compress(data, level)), zstd.decompress
+
+
+CODECS = {
+    # name: (available, default level, factory(level) -> (compress, decompress))
+    'zlib': (True, 6, lambda level: ((lambda data: zlib.compress(data, level)), zlib.decompress)),
+    'lzma': (True, 6, lambda level: ((lambda data: lzma.compress(data, preset=level)), lzma.decompress)),
+    'lz4': (lz4_frame is not None, 0, lambda level: ((lambda data: lz4_frame.compress(data, compression_level=level)), lz4_frame.decompress)),
+    'zstd': (zstd is not None, 3, _zstd_codec),
+}
+
+
+def available_codecs():
+    return [name for name, (available, _, _) in CODECS.items() if available]
+
+
+def get_codec(name, level=None):
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec {name}, expected one of {', '.join(CODECS)}")
+    available, default_level, factory = CODECS[name]
+    if not available:
+        raise RuntimeError(f"The {name} codec needs the {'lz4' if name == 'lz4' else 'zstandard'} package")
+    return factory(default_level if level is None else level)
+
+
+def encode_chunk(timestamps, samples, compress):
+    # timestamps: (n,) float64, samples: (n, channels) int8
+    emg = np.ascontiguousarray(samples, dtype=np.int8).view(np.uint8)
+    emg_delta = emg.copy()
+    emg_delta[1:] -= emg[:-1]
+    bits = np.ascontiguousarray(timestamps, dtype=np.float64).view(np.uint64)
+    bits_delta = bits.copy()
+    bits_delta[1:] -= bits[:-1]
+    shuffled = bits_delta.view(np.uint8).reshape(-1, 8).T
+    return compress(emg_delta.T.tobytes() + shuffled.tobytes())
+
+
+def decode_chunk(payload, samples, channels, decompress):
+    raw = decompress(payload)
+    emg_bytes = samples * channels
+    emg_delta = np.frombuffer(raw, dtype=np.uint8, count=emg_bytes).reshape(channels, samples).T
+    emg = np.cumsum(emg_delta, axis=0, dtype=np.uint8).view(np.int8)
+    shuffled = np.frombuffer(raw, dtype=np.uint8, offset=emg_bytes).reshape(8, samples)
+    bits = np.cumsum(np.ascontiguousarray(shuffled.T).view(np.uint64).ravel(), dtype=np.uint64)
+    return bits.view(np.float64), emg
+
+
+class CompressedSessionRecorder(SessionRecorder):
+    def __init__(self, path, channels=8, sample_rate=200, device_uuid='', serial_number='', calibration=None,
+                 codec=DEFAULT_CODEC, level=None, chunk_seconds=DEFAULT_CHUNK_SECONDS):
+        self.codec = codec
+        self.compress, _ = get_codec(codec, level)
+        self.chunk_samples = max(1, int(chunk_seconds * sample_rate))
+        self.error = None
+        super().__init__(path, channels=channels, sample_rate=sample_rate, device_uuid=device_uuid,
+                         serial_number=serial_number, calibration=calibration)
+
+    def _open_storage(self):
+        self.meta.update(storage=STORAGE, codec=self.codec, chunk_samples=self.chunk_samples)
+        self._pending_timestamps = []
+        self._pending_samples = []
+        self._pending_count = 0
+        self._chunk_start = 0
+        self._chunks = queue.Queue() # unbounded, so write() never blocks on the disk
+        self._writer = threading.Thread(target=self._write_chunks, name='myo-compressed-writer', daemon=True)
+        self._writer.start()
+
+    def _write_samples(self, timestamps, samples):
+        self._pending_timestamps.append(timestamps)
+        self._pending_samples.append(samples)
+        self._pending_count += len(samples)
+        while self._pending_count >= self.chunk_samples:
+            self._submit(self.chunk_samples)
+
+    def _submit(self, count):
+        timestamps = np.concatenate(self._pending_timestamps)
+        samples = np.concatenate(self._pending_samples)
+        self._chunks.put((self._chunk_start, timestamps[:count], samples[:count]))
+        self._chunk_start += count
+        self._pending_timestamps = [timestamps[count:]]
+        self._pending_samples = [samples[count:]]
+        self._pending_count = len(samples) - count
+
+    def _write_chunks(self):
+        with open(os.path.join(self.path, CHUNKS_FILE), 'ab') as chunks_file, open(os.path.join(self.path, INDEX_FILE), 'ab') as index_file:
+            offset = chunks_file.tell()
+            while True:
+                item = self._chunks.get()
+                if item is None:
+                    return
+                first_sample, timestamps, samples = item
+                try:
+                    payload = encode_chunk(timestamps, samples, self.compress)
+                    chunks_file.write(payload)
+                    chunks_file.flush()
+                    record = np.array([(offset, len(payload), first_sample, len(samples), timestamps[0], timestamps[-1])], dtype=INDEX_DTYPE)
+                    index_file.write(record.tobytes())
+                    index_file.flush()
+                    offset += len(payload)
+                except Exception as e:
+                    self.error = e
+                    print(f"Compressed recording to {self.path} failed: {e}")
+
+    def _flush_storage(self):
+        # Partial chunks stay buffered; at most chunk_seconds of samples are lost if the app dies
+        pass
+
+    def _close_storage(self):
+        if self._pending_count:
+            self._submit(self._pending_count)
+        self._chunks.put(None)
+        self._writer.join()
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        if self.error is not None:
+            raise RuntimeError(f"Compressed recording to {self.path} is incomplete: {self.error}")
+
+
+class ChunkedArray():
+    # Read-only array view over one field of a compressed session. Indexing decodes only the
+    # chunks it touches and returns a regular ndarray.
+    def __init__(self, reader, field):
+        self.reader = reader
+        self.field = field
+        self.dtype = np.dtype(np.float64 if field == 'timestamps' else np.int8)
+        self.shape = (reader.sample_count,) if field == 'timestamps' else (reader.sample_count, reader.channels)
+        self.ndim = len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _rows(self, start, stop):
+        return self.reader.read(start, stop)[0 if self.field == 'timestamps' else 1]
+
+    def __getitem__(self, key):
+        rows, rest = (key[0], key[1:]) if isinstance(key, tuple) else (key, ())
+        if isinstance(rows, slice) and rows.step in (None, 1):
+            start, stop, _ = rows.indices(len(self))
+            values = self._rows(start, max(start, stop))
+        elif isinstance(rows, (int, np.integer)):
+            index = int(rows) + len(self) if rows < 0 else int(rows)
+            if not 0 <= index < len(self):
+                raise IndexError(f"index {rows} is out of bounds for {len(self)} samples")
+            values = self._rows(index, index + 1)[0]
+        else:
+            indices = np.arange(len(self))[rows] if isinstance(rows, slice) else np.asarray(rows)
+            if indices.dtype == bool:
+                indices = np.flatnonzero(indices)
+            indices = np.where(indices < 0, indices + len(self), indices)
+            if len(indices) == 0:
+                values = self._rows(0, 0)
+            else:
+                low = int(indices.min())
+                values = self._rows(low, int(indices.max()) + 1)[indices - low]
+        if not rest:
+            return values
+        return values[rest] if values.ndim < len(self.shape) else values[(slice(None),) + rest]
+
+    def __array__(self, dtype=None, copy=None):
+        values = self._rows(0, len(self))
+        return values if dtype is None else values.astype(dtype)
+
+
+class CompressedSessionReader(SessionReader):
+    def __init__(self, path, cache_chunks=8):
+        self.cache_chunks = cache_chunks
+        super().__init__(path)
+
+    def _open_storage(self):
+        _, self.decompress = get_codec(self.meta.get('codec', DEFAULT_CODEC))
+        chunks_path = os.path.join(self.path, CHUNKS_FILE)
+        index_path = os.path.join(self.path, INDEX_FILE)
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE, count=os.path.getsize(index_path) // INDEX_DTYPE.itemsize) \
+            if os.path.exists(index_path) else np.zeros(0, dtype=INDEX_DTYPE)
+        # Only trust chunks whose bytes made it to disk
+        chunks_size = os.path.getsize(chunks_path) if os.path.exists(chunks_path) else 0
+        self.index = index[index['offset'] + index['length'] <= chunks_size]
+        self.sample_count = int(self.index['samples'].sum())
+        self._chunks_file = open(chunks_path, 'rb') if chunks_size else None
+        self._cache = OrderedDict()
+        self.emg = ChunkedArray(self, 'emg')
+        self.timestamps = ChunkedArray(self, 'timestamps')
+
+    def chunk(self, i):
+        # Decoded (timestamps, emg) of chunk i, with a small LRU cache for repeated random access
+        cached = self._cache.get(i)
+        if cached is not None:
+            self._cache.move_to_end(i)
+            return cached
+        record = self.index[i]
+        self._chunks_file.seek(int(record['offset']))
+        payload = self._chunks_file.read(int(record['length']))
+        decoded = decode_chunk(payload, int(record['samples']), self.channels, self.decompress)
+        self._cache[i] = decoded
+        if len(self._cache) > self.cache_chunks:
+            self._cache.popitem(last=False)
+        return decoded
+
+    def read(self, start, end):
+        # (timestamps, emg) for samples [start, end)
+        start, end = max(0, start), min(self.sample_count, end)
+        if end <= start:
+            return np.zeros(0), np.zeros((0, self.channels), dtype=np.int8)
+        first_samples = self.index['first_sample']
+        first = int(np.searchsorted(first_samples, start, side='right')) - 1
+        last = int(np.searchsorted(first_samples, end, side='left'))
+        parts = [self.chunk(i) for i in range(first, last)]
+        offset = start - int(first_samples[first])
+        timestamps = np.concatenate([p[0] for p in parts]) if len(parts) > 1 else parts[0][0]
+        emg = np.concatenate([p[1] for p in parts]) if len(parts) > 1 else parts[0][1]
+        return timestamps[offset:offset + end - start], emg[offset:offset + end - start]
+
+    @property
+    def duration(self):
+        return float(self.index['last_time'][-1]) if self.sample_count else 0.0
+
+    def _time_index(self, t):
+        # First sample at or after time t, decoding a single chunk
+        i = int(np.searchsorted(self.index['last_time'], t, side='left'))
+        if i == len(self.index):
+            return self.sample_count
+        return int(self.index['first_sample'][i]) + int(np.searchsorted(self.chunk(i)[0], t, side='left'))
+
+    def index_range(self, start=None, end=None):
+        i0 = 0 if start is None else self._time_index(start)
+        i1 = self.sample_count if end is None else self._time_index(end)
+        return i0, max(i0, i1)
+
+    def close(self):
+        if self._chunks_file is not None:
+            self._chunks_file.close()
+
+
+def compress_session(session_path, out_path, codec=DEFAULT_CODEC, level=None, chunk_seconds=DEFAULT_CHUNK_SECONDS):
+    # Re-encode an existing session (either format) into a new compressed session directory
+    session = open_session(session_path)
+    recorder = CompressedSessionRecorder(out_path, channels=session.channels, sample_rate=session.sample_rate,
+                                         codec=codec, level=level, chunk_seconds=chunk_seconds)
+    # Keep device, calibration and timing information; only the storage fields are new
+    original = {key: value for key, value in session.meta.items() if key not in ('storage', 'codec', 'chunk_samples')}
+    recorder.meta.update(original)
+    step = recorder.chunk_samples * 16
+    for start in range(0, session.sample_count, step):
+        recorder.write(session.timestamps[start:start + step], session.emg[start:start + step])
+    for event in session.events():
+        recorder.copy_event(event)
+    recorder.close()
+    if 'stopped' in original:
+        recorder.meta['stopped'] = original['stopped']
+        recorder._write_meta()
+    return recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert recorded sessions to the compressed chunked format")
+    parser.add_argument('path', help="session directory or a directory of sessions")
+    parser.add_argument('-o', '--output', required=True, help="directory for the compressed sessions")
+    parser.add_argument('--codec', default=DEFAULT_CODEC, choices=list(CODECS))
+    parser.add_argument('--level', type=int, help="compression level (codec default if omitted)")
+    parser.add_argument('--chunk-seconds', type=float, default=DEFAULT_CHUNK_SECONDS)
+    args = parser.parse_args()
+
+    session_paths = find_sessions(args.path)
+    if not session_paths:
+        print(f"No sessions found in {args.path}")
+        sys.exit(1)
+    try:
+        for session_path in session_paths:
+            start_time = time.perf_counter()
+            out_path = os.path.join(args.output, os.path.basename(session_path.rstrip(os.sep)))
+            compress_session(session_path, out_path, codec=args.codec, level=args.level, chunk_seconds=args.chunk_seconds)
+            before = sum(os.path.getsize(os.path.join(session_path, name)) for name in os.listdir(session_path))
+            after = sum(os.path.getsize(os.path.join(out_path, name)) for name in os.listdir(out_path))
+            print(f"{session_path} -> {out_path}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+                  f"({before / max(after, 1):.1f}x) in {time.perf_counter() - start_time:.2f} s")
+    except (RuntimeError, ValueError) as e:
+        print(e)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+from collections import namedtuple
+import numpy as np
+
+# Live inter-channel covariance / correlation of the EMG, exponentially weighted over time.
+# Each batch of n samples X (n, channels) updates the weighted sums with matrix products:
+#   W <- d^n W + sum(w)        S <- d^n S + w @ X        M <- d^n M + (w * X)^T @ X
+# where w[i] = d^(n-1-i) and d is the per-sample decay, so the result is exactly what a
+# sample-by-sample update would give, with one (channels x channels) product per batch.
+# With rectify=True the matrix is computed on |x|, which shows co-activation (synergies)
+# rather than waveform cross-talk.
+
+CorrelationUpdate = namedtuple('CorrelationUpdate', ['timestamp', 'sample', 'correlation', 'covariance'])
+
+
+class StreamingCorrelation():
+    def __init__(self, channels=8, sample_rate=200, half_life_seconds=2.0, rectify=False, publish_every=20):
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.decay = 0.5 ** (1 / (half_life_seconds * sample_rate))
+        self.rectify = rectify
+        self.publish_every = publish_every
+        self._weights = {}
+        self.reset()
+
+    def reset(self):
+        self.sample_count = 0
+        self.weight = 0.0
+        self.sum = np.zeros(self.channels)
+        self.products = np.zeros((self.channels, self.channels))
+        self._next_publish = self.publish_every
+
+    def _batch_weights(self, n):
+        weights = self._weights.get(n)
+        if weights is None:
+            weights = self._weights[n] = self.decay ** np.arange(n - 1, -1, -1)
+        return weights
+
+    def push(self, samples, timestamps=None):
+        # samples: (n, channels). Returns a CorrelationUpdate every `publish_every` samples, else None.
+        samples = np.asarray(samples, dtype=np.float64)
+        n = len(samples)
+        if n == 0:
+            return None
+        if self.rectify:
+            samples = np.abs(samples)
+        weights = self._batch_weights(n)
+        batch_decay = self.decay ** n
+        self.weight = batch_decay * self.weight + weights.sum()
+        self.sum = batch_decay * self.sum + weights @ samples
+        self.products = batch_decay * self.products + (samples * weights[:, None]).T @ samples
+        self.sample_count += n
+
+        if self.sample_count < self._next_publish:
+            return None
+        self._next_publish = self.sample_count + self.publish_every
+        timestamp = float(timestamps[-1]) if timestamps is not None else None
+        return CorrelationUpdate(timestamp, self.sample_count, self.correlation(), self.covariance())
+
+    @property
+    def mean(self):
+        return self.sum / max(self.weight, 1e-12)
+
+    def covariance(self):
+        if self.weight <= 0:
+            return np.zeros((self.channels, self.channels))
+        mean = self.mean
+        return self.products / self.weight - np.outer(mean, mean)
+
+    def correlation(self):
+        covariance = self.covariance()
+        std = np.sqrt(np.maximum(np.diag(covariance), 1e-12))
+        correlation = np.clip(covariance / np.outer(std, std), -1.0, 1.0)
+        np.fill_diagonal(correlation, 1.0)
+        return correlation
@@ -0,0 +1,176 @@
+import argparse, json, os, sys, time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from myo_calibration import Calibration
+from myo_dsp import DSPPipeline, window_count
+from myo_labels import LabelTrack, SOURCES
+from myo_recording import find_sessions, open_session
+
+# Builds a training set of fixed-shape EMG windows from labelled sessions:
+#   X.npy              (N, window, channels) int8 raw samples, or float32 with --filtered
+#   y.npy              (N,) int16 index into dataset.json's classes
+#   session_index.npy  (N,) int32 index into dataset.json's sessions
+#   start_sample.npy   (N,) int64 first sample of each window in its session
+# A cheap first pass reads only the label tracks to count each session's labelled windows, so
+# X.npy can be allocated up front and every session written into its own slice of it by a
+# worker process. Windows are strided views of the samples (sliding_window_view), so the only
+# copy is the one into the memory-mapped output, and each worker holds at most one chunk.
+
+DEFAULT_CHUNK_SECONDS = 60
+DATASET_FILE = 'dataset.json'
+
+
+def plan_session(session_path, window, hop, source='hotkeys', rule='center'):
+    # Returns (channels, window starts, labels) of the labelled windows, without reading any EMG
+    session = open_session(session_path)
+    starts = np.arange(window_count(session.sample_count, window, hop), dtype=np.int64) * hop
+    track = LabelTrack.from_session(session, source)
+    index = track.window_labels(starts, window, rule)
+    keep = index >= 0
+    labels = np.array(track.labels, dtype=object)[index[keep]] if len(track) else np.zeros(0, dtype=object)
+    return session.channels, starts[keep], labels.tolist()
+
+
+def write_session(session_path, out_path, offset, starts, window, filtered=False, dsp_config=None, calibrate=True,
+                  chunk_seconds=DEFAULT_CHUNK_SECONDS):
+    # Copy the windows beginning at `starts` (sorted) into X.npy rows [offset, offset + len(starts))
+    start_time = time.perf_counter()
+    session = open_session(session_path)
+    X = np.load(os.path.join(out_path, 'X.npy'), mmap_mode='r+')
+    out = X[offset:offset + len(starts)]
+
+    if not filtered and isinstance(session.emg, np.ndarray):
+        # Raw memory-mapped session: window the whole recording in place, copy in blocks
+        windows = sliding_window_view(session.emg, window, axis=0).transpose(0, 2, 1)
+        block = max(1, int(chunk_seconds * session.sample_rate) // window)
+        for i in range(0, len(starts), block):
+            np.take(windows, starts[i:i + block], axis=0, out=out[i:i + block])
+    else:
+        calibration = None
+        if calibrate and session.meta.get('calibration'):
+            calibration = Calibration.from_dict(session.meta['calibration'])
+        pipeline = DSPPipeline.from_config(dsp_config, channels=session.channels, sample_rate=session.sample_rate)
+        chunk_samples = max(window, int(chunk_seconds * session.sample_rate))
+        carry = np.zeros((0, session.channels), dtype=out.dtype)
+        written = 0
+        for chunk_start in range(0, session.sample_count, chunk_samples):
+            chunk = session.emg[chunk_start:chunk_start + chunk_samples]
+            if filtered:
+                chunk = pipeline.filter.process(calibration.apply(chunk) if calibration is not None else chunk)
+            data = np.concatenate([carry, np.asarray(chunk, dtype=out.dtype)])
+            base = chunk_start + len(chunk) - len(data) # absolute sample index of data[0]
+            if len(data) >= window:
+                windows = sliding_window_view(data, window, axis=0).transpose(0, 2, 1)
+                end = written + int(np.searchsorted(starts[written:], base + len(windows)))
+                np.take(windows, starts[written:end] - base, axis=0, out=out[written:end])
+                written = end
+            carry = data[len(data) - min(len(data), window - 1):]
+    X.flush()
+    return session_path, len(starts), time.perf_counter() - start_time
+
+
+def build_dataset(session_paths, out_path, window, hop, source='hotkeys', rule='center', filtered=False,
+                  dsp_config=None, calibrate=True, chunk_seconds=DEFAULT_CHUNK_SECONDS, workers=None):
+    # Yields (session_path, windows, seconds) as sessions finish
+    workers = min(workers or os.cpu_count() or 1, max(1, len(session_paths)))
+    executor = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        plan_args = (window, hop, source, rule)
+        if executor is not None:
+            plans = list(executor.map(plan_session, session_paths, *([arg] * len(session_paths) for arg in plan_args)))
+        else:
+            plans = [plan_session(session_path, *plan_args) for session_path in session_paths]
+        channels = {plan[0] for plan in plans}
+        if len(channels) > 1:
+            raise ValueError(f"Sessions have different channel counts: {sorted(channels)}")
+        channels = channels.pop() if channels else 8
+
+        classes = sorted({label for _, _, labels in plans for label in labels})
+        codes = {label: i for i, label in enumerate(classes)}
+        total = sum(len(starts) for _, starts, _ in plans)
+        os.makedirs(out_path, exist_ok=True)
+        dtype = np.float32 if filtered else np.int8
+        np.lib.format.open_memmap(os.path.join(out_path, 'X.npy'), mode='w+', dtype=dtype, shape=(total, window, channels)).flush()
+        np.save(os.path.join(out_path, 'y.npy'), np.array([codes[label] for _, _, labels in plans for label in labels], dtype=np.int16))
+        np.save(os.path.join(out_path, 'session_index.npy'),
+                np.concatenate([np.full(len(starts), i, dtype=np.int32) for i, (_, starts, _) in enumerate(plans)] or [np.zeros(0, np.int32)]))
+        np.save(os.path.join(out_path, 'start_sample.npy'), np.concatenate([starts for _, starts, _ in plans] or [np.zeros(0, np.int64)]))
+        with open(os.path.join(out_path, DATASET_FILE), 'w') as f:
+            json.dump({'sessions': [os.path.abspath(path) for path in session_paths], 'classes': classes, 'window': window,
+                       'hop': hop, 'channels': channels, 'dtype': np.dtype(dtype).name, 'source': source, 'rule': rule,
+                       'filtered': filtered, 'dsp': (dsp_config or {}) if filtered else {}, 'windows': int(total)}, f, indent=2)
+
+        offsets = np.cumsum([0] + [len(starts) for _, starts, _ in plans])
+        jobs = [(session_path, out_path, int(offset), starts, window, filtered, dsp_config, calibrate, chunk_seconds)
+                for session_path, offset, (_, starts, _) in zip(session_paths, offsets, plans) if len(starts)]
+        if executor is None:
+            for job in jobs:
+                yield write_session(*job)
+        else:
+            from concurrent.futures import as_completed
+            for future in as_completed([executor.submit(write_session, *job) for job in jobs]):
+                yield future.result()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def load_dataset(path, mmap_mode='r'):
+    # Returns (X, y, info) with X memory-mapped
+    with open(os.path.join(path, DATASET_FILE), 'r') as f:
+        info = json.load(f)
+    return np.load(os.path.join(path, 'X.npy'), mmap_mode=mmap_mode), np.load(os.path.join(path, 'y.npy')), info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a windowed, labelled training set from recorded sessions")
+    parser.add_argument('path', help="session directory or a directory of sessions")
+    parser.add_argument('-o', '--output', required=True, help="dataset directory")
+    parser.add_argument('--window', type=int, help="samples per window (default: dsp.feature_window)")
+    parser.add_argument('--hop', type=int, help="samples between windows (default: dsp.feature_hop)")
+    parser.add_argument('--source', choices=SOURCES, default='hotkeys', help="GUI label hotkeys or onboard POSE events")
+    parser.add_argument('--rule', choices=('center', 'full'), default='center',
+                        help="label windows by their middle sample, or keep only windows entirely inside one label")
+    parser.add_argument('--filtered', action='store_true', help="store calibrated, filtered float32 samples instead of raw int8")
+    parser.add_argument('--no-calibration', action='store_true', help="ignore the calibration stored with each session")
+    parser.add_argument('-j', '--workers', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-seconds', type=float, default=DEFAULT_CHUNK_SECONDS)
+    parser.add_argument('--config', default='myo_config.yaml', help="config file with the dsp section used live")
+    args = parser.parse_args()
+
+    dsp_config = {}
+    if os.path.exists(args.config):
+        import yaml
+        with open(args.config, 'r') as stream:
+            dsp_config = (yaml.safe_load(stream) or {}).get('dsp') or {}
+    window = args.window or dsp_config.get('feature_window', 40)
+    hop = args.hop or dsp_config.get('feature_hop', 20)
+
+    session_paths = find_sessions(args.path)
+    if not session_paths:
+        print(f"No sessions found in {args.path}")
+        sys.exit(1)
+
+    start_time = time.perf_counter()
+    total = 0
+    try:
+        for done, (session_path, windows, seconds) in enumerate(build_dataset(session_paths, args.output, window, hop, args.source, args.rule,
+                                                                               args.filtered, dsp_config, not args.no_calibration,
+                                                                               args.chunk_seconds, args.workers), start=1):
+            total += windows
+            print(f"[{done}] {session_path}: {windows} windows in {seconds:.2f} s")
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    _, y, info = load_dataset(args.output)
+    counts = np.bincount(y, minlength=len(info['classes']))
+    print(f"Wrote {total} windows of {window} x {info['channels']} to {args.output} in {time.perf_counter() - start_time:.2f} s")
+    for label, count in zip(info['classes'], counts):
+        print(f"  {label}: {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Streaming EMG filtering and windowed features shared by the live GUI and offline batch tools.
+# Everything is stateful and batch-oriented: feeding a recording in one call or in arbitrary
+# chunks gives the same output, which is what lets the batch command split sessions into chunks.
+# With scipy that holds bit for bit. The numpy filter fallback filters whole blocks with matrix
+# products and the rest of a chunk sample by sample, so chunking changes the rounding: outputs
+# agree to about 1e-15 relative to the signal, not exactly.
+
+FEATURE_NAMES = ('mav', 'rms', 'wl', 'zc')
+
+# scipy.signal takes longer to import than the rest of the headless core together, so it is
+# only looked up when the first filter runs
+sosfilt = None
+_scipy_checked = False
+NUMPY_BLOCK = 128 # samples per matrix product in the numpy fallback
+
+
+def scipy_sosfilt():
+    global sosfilt, _scipy_checked
+    if not _scipy_checked:
+        _scipy_checked = True
+        try:
+            from scipy.signal import sosfilt
+        except ImportError:
+            sosfilt = None
+    return sosfilt
+
+
+def highpass_sos(cutoff, sample_rate, q=1 / math.sqrt(2)):
+    # 2nd order Butterworth high-pass (RBJ cookbook biquad)
+    w0 = 2 * math.pi * cutoff / sample_rate
+    alpha = math.sin(w0) / (2 * q)
+    cos_w0 = math.cos(w0)
+    b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+    a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    return [v / a[0] for v in b] + [1.0, a[1] / a[0], a[2] / a[0]]
+
+
+def notch_sos(frequency, sample_rate, q=30):
+    # Narrow band-stop for mains interference (RBJ cookbook biquad)
+    w0 = 2 * math.pi * frequency / sample_rate
+    alpha = math.sin(w0) / (2 * q)
+    cos_w0 = math.cos(w0)
+    b = [1.0, -2 * cos_w0, 1.0]
+    a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    return [v / a[0] for v in b] + [1.0, a[1] / a[0], a[2] / a[0]]
+
+
+class StreamingFilter():
+    def __init__(self, channels=8, sample_rate=200, highpass=None, notch=None):
+        sections = []
+        if highpass:
+            sections.append(highpass_sos(highpass, sample_rate))
+        if notch:
+            sections.append(notch_sos(notch, sample_rate))
+        self.channels = channels
+        self.sos = np.array(sections, dtype=np.float64).reshape(-1, 6)
+        self._blocks = None # numpy fallback block matrices, built on first use
+        self.reset()
+
+    def reset(self):
+        # Transposed direct form II state, laid out like scipy's sosfilt zi for axis=0
+        self.zi = np.zeros((len(self.sos), 2, self.channels), dtype=np.float64)
+
+    def process(self, samples):
+        samples = np.asarray(samples, dtype=np.float64)
+        if len(self.sos) == 0 or len(samples) == 0:
+            return samples
+        if scipy_sosfilt() is not None:
+            filtered, self.zi = sosfilt(self.sos, samples, axis=0, zi=self.zi)
+            return filtered
+        return self._process_numpy(samples)
+
+    def _process_numpy(self, samples):
+        # Fallback when scipy isn't installed. The cascade is linear, so a block of samples filters
+        # as one product with its impulse response plus the response to the state it starts from:
+        # only the state is carried block to block, and the remainder runs sample by sample.
+        blocks = len(samples) // NUMPY_BLOCK
+        output = np.empty_like(samples)
+        if blocks:
+            if self._blocks is None:
+                self._blocks = block_response(self.sos, NUMPY_BLOCK)
+            impulse, state_response, input_to_state, transition = self._blocks
+            x = samples[:blocks * NUMPY_BLOCK].reshape(blocks, NUMPY_BLOCK, -1)
+            driven = input_to_state @ x
+            states = np.empty((blocks,) + driven.shape[1:])
+            state = self.zi.reshape(len(transition), -1)
+            for block in range(blocks):
+                states[block] = state
+                state = transition @ state + driven[block]
+            output[:blocks * NUMPY_BLOCK] = (impulse @ x + state_response @ states).reshape(-1, samples.shape[1])
+            self.zi = state.reshape(self.zi.shape)
+        output[blocks * NUMPY_BLOCK:], self.zi = sos_recursion(self.sos, samples[blocks * NUMPY_BLOCK:], self.zi)
+        return output
+
+
+def sos_recursion(sos, samples, zi):
+    # Transposed direct form II, one sample at a time, vectorised across columns; returns (output, final state)
+    output = samples.copy()
+    zf = zi.copy()
+    for section, (b0, b1, b2, _, a1, a2) in enumerate(sos):
+        z0, z1 = zf[section]
+        for i in range(len(output)):
+            x = output[i].copy()
+            y = b0 * x + z0
+            z0 = b1 * x - a1 * y + z1
+            z1 = b2 * x - a2 * y
+            output[i] = y
+        zf[section, 0] = z0
+        zf[section, 1] = z1
+    return output, zf
+
+
+def block_response(sos, length):
+    # Matrices of a `length` sample block, found by running the recursion on unit inputs and unit states:
+    # impulse (length, length) and state_response (length, states) give the output, input_to_state
+    # (states, length) and transition (states, states) the state after the block
+    states = 2 * len(sos)
+    impulse, input_to_state = sos_recursion(sos, np.eye(length), np.zeros((len(sos), 2, length)))
+    state_response, transition = sos_recursion(sos, np.zeros((length, states)), np.eye(states).reshape(len(sos), 2, states))
+    return impulse, state_response, input_to_state.reshape(states, length), transition.reshape(states, states)
+
+
+def window_features(windows):
+    # windows: (n_windows, channels, window) -> (n_windows, channels, len(FEATURE_NAMES))
+    mav = np.mean(np.abs(windows), axis=-1)
+    rms = np.sqrt(np.mean(windows ** 2, axis=-1))
+    wl = np.sum(np.abs(np.diff(windows, axis=-1)), axis=-1)
+    zc = np.sum(np.signbit(windows[..., 1:]) != np.signbit(windows[..., :-1]), axis=-1)
+    return np.stack([mav, rms, wl, zc], axis=-1).astype(np.float32)
+
+
+class FeatureExtractor():
+    def __init__(self, channels=8, window=40, hop=20):
+        if hop > window:
+            raise ValueError("hop must not be larger than window")
+        self.channels = channels
+        self.window = window
+        self.hop = hop
+        self.reset()
+
+    def reset(self):
+        self._buffer = np.zeros((0, self.channels), dtype=np.float64)
+        self._buffer_start = 0 # absolute sample index of _buffer[0]
+
+    def process(self, samples):
+        # Returns (features, window_end) where window_end is the absolute index one past each window's last sample
+        samples = np.asarray(samples, dtype=np.float64)
+        self._buffer = np.concatenate([self._buffer, samples]) if len(self._buffer) else samples
+        if len(self._buffer) < self.window:
+            return np.zeros((0, self.channels, len(FEATURE_NAMES)), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        count = 1 + (len(self._buffer) - self.window) // self.hop
+        windows = sliding_window_view(self._buffer, self.window, axis=0)[::self.hop][:count]
+        features = window_features(windows)
+        window_end = self._buffer_start + self.window + self.hop * np.arange(count, dtype=np.int64)
+        consumed = count * self.hop
+        self._buffer = self._buffer[consumed:].copy()
+        self._buffer_start += consumed
+        return features, window_end
+
+
+def window_count(samples, window, hop):
+    return 0 if samples < window else 1 + (samples - window) // hop
+
+
+class DSPPipeline():
+    def __init__(self, channels=8, sample_rate=200, highpass=20, notch=None, window=40, hop=20):
+        self.sample_rate = sample_rate
+        self.filter = StreamingFilter(channels=channels, sample_rate=sample_rate, highpass=highpass, notch=notch)
+        self.features = FeatureExtractor(channels=channels, window=window, hop=hop)
+
+    @classmethod
+    def from_config(cls, config, channels=8, sample_rate=200):
+        config = config or {}
+        return cls(channels=channels, sample_rate=sample_rate,
+                   highpass=config.get('highpass', 20), notch=config.get('notch'),
+                   window=config.get('feature_window', 40), hop=config.get('feature_hop', 20))
+
+    def reset(self):
+        self.filter.reset()
+        self.features.reset()
+
+    def process(self, samples):
+        # Returns (filtered samples, features, window_end)
+        filtered = self.filter.process(samples)
+        features, window_end = self.features.process(filtered)
+        return filtered, features, window_end
+
+
+def pose_labels(events, window_times, default='REST'):
+    # Label each window with the onboard classifier pose that was active at its end time
+    pose_times = []
+    poses = []
+    for event in events:
+        if event.get('event') == 'POSE' and event.get('value'):
+            pose_times.append(event['t'])
+            poses.append(event['value'])
+    labels = np.array([default] + poses)
+    return labels[np.searchsorted(np.array(pose_times, dtype=np.float64), window_times, side='right')]
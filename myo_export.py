@@ -0,0 +1,184 @@
+import argparse, io, os, sys, time, zipfile
+import numpy as np
+from myo_recording import open_session
+
+# Streams a recorded session to .npz, Parquet or CSV in fixed-size chunks.
+# Only a bounded number of chunks is ever in memory: each worker memory-maps the session,
+# converts its own [i0, i1) slice and the parent writes the results back in order.
+
+FORMATS = ('npz', 'parquet', 'csv')
+DEFAULT_CHUNK_SECONDS = 60
+
+
+def parse_channels(text, channel_count=8):
+    # "1,3,5-8" -> [0, 2, 4, 5, 6, 7] (channels are numbered from 1 like in the GUI)
+    if not text:
+        return list(range(channel_count))
+    channels = []
+    for part in text.split(','):
+        bounds = part.strip().split('-')
+        if len(bounds) > 2 or not all(bound.strip().isdigit() for bound in bounds):
+            raise ValueError(f"Bad channel range {part}")
+        first, last = int(bounds[0]), int(bounds[-1])
+        if first > last:
+            raise ValueError(f"Bad channel range {part}")
+        channels.extend(range(first, last + 1))
+    if not channels:
+        raise ValueError("No channels selected")
+    for channel in channels:
+        if not 1 <= channel <= channel_count:
+            raise ValueError(f"Channel {channel} is out of range 1-{channel_count}")
+    return [channel - 1 for channel in channels]
+
+
+def column_names(channels):
+    return ['t'] + [f"emg{channel + 1}" for channel in channels]
+
+
+def chunk_ranges(i0, i1, chunk_samples):
+    return [(start, min(start + chunk_samples, i1)) for start in range(i0, i1, chunk_samples)]
+
+
+def _read_chunk(session_path, i0, i1, channels):
+    session = open_session(session_path)
+    return np.array(session.timestamps[i0:i1]), np.array(session.emg[i0:i1, channels])
+
+
+def _convert_chunk(fmt, session_path, i0, i1, channels):
+    # Runs in a worker process
+    timestamps, emg = _read_chunk(session_path, i0, i1, channels)
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        data = np.column_stack([timestamps, emg])
+        np.savetxt(buffer, data, delimiter=',', fmt=['%.6f'] + ['%d'] * len(channels))
+        return buffer.getvalue().encode('ascii')
+    if fmt == 'parquet':
+        import pyarrow as pa
+        arrays = [pa.array(timestamps)] + [pa.array(emg[:, c]) for c in range(emg.shape[1])]
+        return pa.Table.from_arrays(arrays, names=column_names(channels))
+    return timestamps, emg
+
+
+def _ordered_results(fmt, session_path, ranges, channels, workers):
+    if workers <= 1 or len(ranges) <= 1:
+        for i0, i1 in ranges:
+            yield _convert_chunk(fmt, session_path, i0, i1, channels)
+        return
+    # Keep at most 2 chunks per worker in flight so memory stays bounded regardless of session length
+    max_in_flight = 2 * workers
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        next_range = 0
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < max_in_flight:
+                i0, i1 = ranges[next_range]
+                pending.append(executor.submit(_convert_chunk, fmt, session_path, i0, i1, channels))
+                next_range += 1
+            yield pending.pop(0).result()
+
+
+def _write_npy_header(f, dtype, shape):
+    header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': shape}
+    np.lib.format.write_array_header_2_0(f, header)
+
+
+def _export_npz(out_path, session_path, ranges, channels, sample_count, compress):
+    # np.load()-compatible archive written member by member: the .npy header is written first with
+    # the final shape, then the chunks are streamed straight into the zip entry.
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    session = open_session(session_path)
+    with zipfile.ZipFile(out_path, 'w', compression=compression, allowZip64=True) as archive:
+        with archive.open('t.npy', 'w', force_zip64=True) as f:
+            _write_npy_header(f, np.float64, (sample_count,))
+            for i0, i1 in ranges:
+                f.write(np.ascontiguousarray(session.timestamps[i0:i1]).tobytes())
+        with archive.open('emg.npy', 'w', force_zip64=True) as f:
+            _write_npy_header(f, np.int8, (sample_count, len(channels)))
+            for i0, i1 in ranges:
+                f.write(np.ascontiguousarray(session.emg[i0:i1, channels]).tobytes())
+        with archive.open('channels.npy', 'w') as f:
+            np.lib.format.write_array(f, np.array(channels) + 1)
+
+
+def _export_csv(out_path, session_path, ranges, channels, workers):
+    with open(out_path, 'wb') as f:
+        f.write((','.join(column_names(channels)) + '\n').encode('ascii'))
+        for text in _ordered_results('csv', session_path, ranges, channels, workers):
+            f.write(text)
+
+
+def _export_parquet(out_path, session_path, ranges, channels, workers):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    writer = None
+    try:
+        # One row group per chunk
+        for table in _ordered_results('parquet', session_path, ranges, channels, workers):
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_session(session_path, out_path, fmt, channels=None, start=None, end=None,
+                   chunk_seconds=DEFAULT_CHUNK_SECONDS, workers=None, compress=False):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt}, expected one of {', '.join(FORMATS)}")
+    session = open_session(session_path)
+    channels = list(range(session.channels)) if channels is None else list(channels)
+    workers = workers or os.cpu_count() or 1
+    i0, i1 = session.index_range(start, end)
+    chunk_samples = max(1, int(chunk_seconds * session.sample_rate))
+    ranges = chunk_ranges(i0, i1, chunk_samples)
+
+    match fmt:
+        case 'npz':
+            # Nothing to convert, so this is I/O bound and stays in one process
+            _export_npz(out_path, session_path, ranges, channels, i1 - i0, compress)
+        case 'csv':
+            _export_csv(out_path, session_path, ranges, channels, workers)
+        case 'parquet':
+            _export_parquet(out_path, session_path, ranges, channels, workers)
+    return i1 - i0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a recorded FreeMyo session")
+    parser.add_argument('session', help="session directory")
+    parser.add_argument('-o', '--output', help="output file (default: <session>.<format>)")
+    parser.add_argument('-f', '--format', choices=FORMATS, default='npz')
+    parser.add_argument('-c', '--channels', help="channels to export, e.g. 1,2,5-8 (default: all)")
+    parser.add_argument('--start', type=float, help="start time in seconds")
+    parser.add_argument('--end', type=float, help="end time in seconds")
+    parser.add_argument('--chunk-seconds', type=float, default=DEFAULT_CHUNK_SECONDS, help="seconds of data per chunk / row group")
+    parser.add_argument('-j', '--workers', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--compress', action='store_true', help="deflate the .npz members")
+    args = parser.parse_args()
+
+    session = open_session(args.session)
+    try:
+        channels = parse_channels(args.channels, session.channels)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    output = args.output or f"{args.session.rstrip(os.sep)}.{args.format}"
+
+    start_time = time.perf_counter()
+    try:
+        samples = export_session(args.session, output, args.format, channels=channels, start=args.start, end=args.end,
+                                 chunk_seconds=args.chunk_seconds, workers=args.workers, compress=args.compress)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start_time
+    print(f"Exported {samples} samples x {len(channels)} channels to {output} in {elapsed:.2f} s "
+          f"({samples / max(elapsed, 1e-9) / session.sample_rate:.0f}x real time)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,433 @@
+import argparse, json, os, sys
+from collections import namedtuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from myo_calibration import Calibration
+from myo_dsp import DSPPipeline, FeatureExtractor, FEATURE_NAMES
+from myo_labels import LabelTrack
+from myo_recording import find_sessions, open_session
+from myo_streams import CLASSIFIER_DTYPE
+
+# Custom gesture recognition by matching recorded examples (templates) against the live stream
+# with dynamic time warping, so speed differences between repetitions don't matter.
+# The stream is first reduced to frames: a smoothed rectified envelope (default, 50 Hz) or the
+# per-window RMS features. Every `stride` frames, each template of length m is compared with the
+# last m frames using DTW restricted to a Sakoe-Chiba band of `warp` * m frames:
+#   1. LB_Keogh: the distance from the candidate to the template's band envelope is a lower
+#      bound on the DTW distance, computed for all templates of a length in one vectorised step.
+#      Templates whose bound already exceeds their threshold are skipped.
+#   2. The survivors' DTW rows are computed together, and a template is abandoned as soon as its
+#      cheapest path so far plus the LB_Keogh bound of the columns still ahead exceeds its threshold.
+# Distances are mean squared frame distances along the warping path (total cost / m).
+# The best match is held while it keeps improving and then reported once, followed by a
+# refractory period of half the template length.
+
+SOURCES = ('envelope', 'features')
+DEFAULT_WARP = 0.2
+DEFAULT_THRESHOLD_FACTOR = 1.5
+MAX_NAME_LENGTH = CLASSIFIER_DTYPE['value'].itemsize // 4 # matches are published as classifier records
+
+GestureTemplate = namedtuple('GestureTemplate', ['name', 'frames', 'threshold'])
+GestureMatch = namedtuple('GestureMatch', ['name', 'distance', 'frame', 'timestamp', 'length'])
+
+
+class GestureFrames():
+    # Reduces calibrated, filtered EMG to the frames the templates are made of
+    def __init__(self, channels=8, sample_rate=200, source='envelope', decimate=4, smoothing_ms=50, window=40, hop=20):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown gesture frame source {source}, expected one of {', '.join(SOURCES)}")
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.source = source
+        self.decimate = decimate
+        self.smoothing_ms = smoothing_ms
+        self.window = window
+        self.hop = hop
+        frame_rate = sample_rate / (decimate if source == 'envelope' else hop)
+        self.alpha = 1 - np.exp(-1000 / (smoothing_ms * frame_rate)) if smoothing_ms else 1.0
+        self.features = FeatureExtractor(channels=channels, window=window, hop=hop) if source == 'features' else None
+        self.reset()
+
+    @property
+    def frame_rate(self):
+        return self.sample_rate / (self.decimate if self.source == 'envelope' else self.hop)
+
+    def config(self):
+        return {'source': self.source, 'channels': self.channels, 'sample_rate': self.sample_rate, 'decimate': self.decimate,
+                'smoothing_ms': self.smoothing_ms, 'window': self.window, 'hop': self.hop}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**config)
+
+    def reset(self):
+        self.sample_count = 0
+        self._remainder = np.zeros((0, self.channels))
+        self._smoothed = None
+        if self.features is not None:
+            self.features.reset()
+
+    def process(self, samples):
+        # Returns (frames, frame_end) where frame_end is the absolute index one past each frame's last sample
+        samples = np.asarray(samples, dtype=np.float64)
+        self.sample_count += len(samples)
+        if self.source == 'features':
+            features, window_end = self.features.process(samples)
+            return features[:, :, FEATURE_NAMES.index('rms')].astype(np.float64), window_end
+        rectified = np.abs(np.concatenate([self._remainder, samples])) if len(self._remainder) else np.abs(samples)
+        count = len(rectified) // self.decimate
+        self._remainder = rectified[count * self.decimate:]
+        frames = rectified[:count * self.decimate].reshape(count, self.decimate, self.channels).mean(axis=1)
+        for i in range(count):
+            self._smoothed = frames[i] if self._smoothed is None else self._smoothed + self.alpha * (frames[i] - self._smoothed)
+            frames[i] = self._smoothed
+        frame_end = self.sample_count - len(self._remainder) - self.decimate * np.arange(count - 1, -1, -1, dtype=np.int64)
+        return frames, frame_end
+
+
+def keogh_envelope(frames, band):
+    # Upper/lower envelope of (..., m, d) templates over +-band frames
+    m = frames.shape[-2]
+    pad = [(0, 0)] * frames.ndim
+    pad[-2] = (band, band)
+    padded = np.pad(frames, pad, mode='edge')
+    windows = sliding_window_view(padded, 2 * band + 1, axis=-2)[..., :m, :, :]
+    return windows.max(axis=-1), windows.min(axis=-1)
+
+
+def lb_keogh_terms(candidate, upper, lower):
+    # Per-frame LB_Keogh contributions of an (m, d) candidate against (k, m, d) envelopes -> (k, m)
+    above = np.maximum(candidate - upper, 0)
+    below = np.maximum(lower - candidate, 0)
+    return (above * above + below * below).sum(axis=-1)
+
+
+def banded_dtw(templates, candidate, band, budgets=None, lb_terms=None, norms=None):
+    # Total DTW cost of each (k, m, d) template against an (m, d) candidate within the band.
+    # Templates whose cost provably exceeds their budget are abandoned early and come back as inf.
+    k, m, _ = templates.shape
+    if norms is None:
+        norms = (templates * templates).sum(axis=-1)
+    cost = np.maximum(norms[:, :, None] + (candidate * candidate).sum(axis=-1) - 2 * templates @ candidate.T, 0)
+    result = np.full(k, np.inf)
+    alive = np.arange(k)
+    if budgets is not None:
+        tail = np.zeros((k, m + 1))
+        if lb_terms is not None:
+            tail[:, :m] = np.cumsum(lb_terms[:, ::-1], axis=1)[:, ::-1]
+    previous = None
+    for i in range(m):
+        lo, hi = max(0, i - band), min(m, i + band + 1)
+        row_cost = cost[alive, i, lo:hi]
+        if previous is None:
+            arrive = np.full(row_cost.shape, np.inf)
+            arrive[:, 0] = 0
+        else:
+            # Best of the diagonal and vertical predecessors; the horizontal one is folded in below
+            shifted = np.concatenate([np.full((len(alive), 1), np.inf), previous[:, :-1]], axis=1)
+            arrive = np.minimum(previous, shifted)[:, lo:hi]
+        # D[j] = c[j] + min(arrive[j], D[j-1]) unrolled as a prefix minimum over prefix sums
+        prefix = np.cumsum(row_cost, axis=1)
+        row = prefix + np.minimum.accumulate(arrive - (prefix - row_cost), axis=1)
+        current = np.full((len(alive), m), np.inf)
+        current[:, lo:hi] = row
+        if budgets is not None:
+            keep = row.min(axis=1) + tail[alive, hi] <= budgets[alive]
+            if not keep.all():
+                alive = alive[keep]
+                current = current[keep]
+                if not len(alive):
+                    return result
+        previous = current
+    final = previous[:, m - 1]
+    # The row check above only bounds the cheapest cell, so the finished cost can still be over budget
+    result[alive] = final if budgets is None else np.where(final <= budgets[alive], final, np.inf)
+    return result
+
+
+def resample(frames, length):
+    # Linear interpolation of (n, d) frames to `length` frames
+    frames = np.asarray(frames, dtype=np.float64)
+    if len(frames) == length:
+        return frames
+    source = np.linspace(0, len(frames) - 1, length)
+    index = np.minimum(source.astype(np.int64), len(frames) - 2) if len(frames) > 1 else np.zeros(length, dtype=np.int64)
+    fraction = (source - index)[:, None]
+    upper = frames[np.minimum(index + 1, len(frames) - 1)]
+    return frames[index] * (1 - fraction) + upper * fraction
+
+
+class _TemplateGroup():
+    # Templates of one length, matched in one vectorised pass
+    def __init__(self, templates, warp):
+        self.names = [template.name for template in templates]
+        self.frames = np.stack([np.asarray(template.frames, dtype=np.float64) for template in templates])
+        self.length = self.frames.shape[1]
+        self.band = max(1, int(np.ceil(warp * self.length)))
+        self.budgets = np.array([template.threshold for template in templates], dtype=np.float64) * self.length
+        self.norms = (self.frames * self.frames).sum(axis=-1)
+        self.upper, self.lower = keogh_envelope(self.frames, self.band)
+
+
+class TemplateMatcher():
+    def __init__(self, templates, warp=DEFAULT_WARP, stride=1, settle=3, prune=True):
+        if not templates:
+            raise ValueError("At least one gesture template is required")
+        self.warp = warp
+        self.stride = stride
+        self.settle = settle # evaluations without improvement before the held match is reported
+        self.prune = prune
+        by_length = {}
+        for template in templates:
+            by_length.setdefault(len(template.frames), []).append(template)
+        self.groups = [_TemplateGroup(group, warp) for _, group in sorted(by_length.items())]
+        self.template_count = len(templates)
+        self.channels = self.groups[0].frames.shape[2]
+        self.max_length = max(group.length for group in self.groups)
+        self._buffer = np.zeros((max(4 * self.max_length, 256), self.channels))
+        self.reset()
+
+    def reset(self):
+        self.frame_count = 0
+        self._position = 0
+        self._pending = None
+        self._pending_age = 0
+        self._refractory_until = 0
+        self.stats = {'evaluated': 0, 'lb_pruned': 0, 'abandoned': 0, 'completed': 0, 'matches': 0}
+
+    def _append(self, frame):
+        if self._position == len(self._buffer):
+            # Keep the newest frames contiguous so candidates are plain slices
+            keep = self.max_length - 1
+            self._buffer[:keep] = self._buffer[self._position - keep:self._position]
+            self._position = keep
+        self._buffer[self._position] = frame
+        self._position += 1
+        self.frame_count += 1
+
+    def best_match(self):
+        # (distance, name, length) of the closest template within its threshold for the newest frames, or None
+        best = None
+        for group in self.groups:
+            if self.frame_count < group.length:
+                break
+            candidate = self._buffer[self._position - group.length:self._position]
+            self.stats['evaluated'] += len(group.names)
+            if self.prune:
+                lb_terms = lb_keogh_terms(candidate, group.upper, group.lower)
+                survivors = np.flatnonzero(lb_terms.sum(axis=1) <= group.budgets)
+                self.stats['lb_pruned'] += len(group.names) - len(survivors)
+                if not len(survivors):
+                    continue
+                costs = banded_dtw(group.frames[survivors], candidate, group.band, group.budgets[survivors],
+                                   lb_terms[survivors], group.norms[survivors])
+                finished = np.isfinite(costs)
+                self.stats['abandoned'] += int((~finished).sum())
+            else:
+                survivors = np.arange(len(group.names))
+                costs = banded_dtw(group.frames, candidate, group.band, norms=group.norms)
+                finished = costs <= group.budgets
+            self.stats['completed'] += int(np.isfinite(costs).sum())
+            if not finished.any():
+                continue
+            distances = np.where(finished, costs, np.inf) / group.length
+            i = int(np.argmin(distances))
+            if best is None or distances[i] < best[0]:
+                best = (float(distances[i]), group.names[survivors[i]], group.length)
+        return best
+
+    def push(self, frames, timestamps=None):
+        # frames: (n, d). Returns the list of GestureMatches reported in this batch.
+        matches = []
+        for i, frame in enumerate(np.asarray(frames, dtype=np.float64)):
+            self._append(frame)
+            if self.frame_count < self._refractory_until or self.frame_count % self.stride:
+                continue
+            best = self.best_match()
+            if best is not None and (self._pending is None or best[0] < self._pending.distance):
+                timestamp = float(timestamps[i]) if timestamps is not None else None
+                self._pending = GestureMatch(best[1], best[0], self.frame_count, timestamp, best[2])
+                self._pending_age = 0
+            elif self._pending is not None:
+                self._pending_age += 1
+                if best is None or self._pending_age >= self.settle:
+                    matches.append(self._pending)
+                    self._refractory_until = self.frame_count + self._pending.length // 2
+                    self._pending = None
+        self.stats['matches'] += len(matches)
+        return matches
+
+
+def check_names(names):
+    too_long = sorted({name for name in names if len(name) > MAX_NAME_LENGTH})
+    if too_long:
+        raise ValueError(f"Gesture names must be at most {MAX_NAME_LENGTH} characters: {', '.join(too_long)}")
+
+
+def save_templates(path, templates, frames_config, warp=DEFAULT_WARP):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'frames': frames_config, 'warp': warp,
+                   'templates': [{'name': template.name, 'threshold': template.threshold,
+                                  'frames': np.round(np.asarray(template.frames), 6).tolist()} for template in templates]}, f)
+
+
+def load_templates(path):
+    # Returns (templates, frames config, warp)
+    with open(path, 'r') as f:
+        data = json.load(f)
+    templates = [GestureTemplate(t['name'], np.array(t['frames'], dtype=np.float64), float(t['threshold'])) for t in data['templates']]
+    check_names(template.name for template in templates)
+    return templates, data['frames'], data.get('warp', DEFAULT_WARP)
+
+
+def session_frames(session, frames, dsp_config=None, calibrate=True, chunk_seconds=60):
+    # Frames of a whole recorded session, computed exactly like the live pipeline. Returns (frames, frame_end).
+    calibration = None
+    if calibrate and session.meta.get('calibration'):
+        calibration = Calibration.from_dict(session.meta['calibration'])
+    pipeline = DSPPipeline.from_config(dsp_config, channels=session.channels, sample_rate=session.sample_rate)
+    frames.reset()
+    chunk_samples = max(1, int(chunk_seconds * session.sample_rate))
+    all_frames, all_ends = [np.zeros((0, session.channels))], [np.zeros(0, dtype=np.int64)]
+    for start in range(0, session.sample_count, chunk_samples):
+        chunk = session.emg[start:start + chunk_samples]
+        if calibration is not None:
+            chunk = calibration.apply(chunk)
+        chunk_frames, chunk_ends = frames.process(pipeline.filter.process(chunk))
+        all_frames.append(chunk_frames)
+        all_ends.append(chunk_ends)
+    return np.concatenate(all_frames), np.concatenate(all_ends)
+
+
+def collect_examples(session_paths, frames, dsp_config=None, calibrate=True, ignore=('REST',)):
+    # {label: [example frames]} from the hotkey label intervals of recorded sessions
+    examples = {}
+    for session_path in session_paths:
+        session = open_session(session_path)
+        track = LabelTrack.from_session(session, 'hotkeys')
+        if not len(track):
+            continue
+        values, frame_end = session_frames(session, frames, dsp_config, calibrate)
+        frame_length = frames.decimate if frames.source == 'envelope' else frames.window
+        for start, end, label in track:
+            if label in ignore:
+                continue
+            # Frames whose samples all lie inside the interval
+            first = int(np.searchsorted(frame_end, start + frame_length, side='left'))
+            last = int(np.searchsorted(frame_end, end, side='right'))
+            if last - first >= 2:
+                examples.setdefault(label, []).append(values[first:last])
+    return examples
+
+
+def build_templates(examples, warp=DEFAULT_WARP, threshold_factor=DEFAULT_THRESHOLD_FACTOR):
+    # One template per example, resampled to the median example length of its label. Each label's
+    # threshold is threshold_factor times the largest distance from one of its examples to the
+    # nearest other example, capped below the distance to the nearest example of any other label.
+    # Labels with a single example fall back to a quarter of its mean squared frame magnitude.
+    check_names(examples)
+    resampled = {}
+    for label, label_examples in examples.items():
+        length = int(np.median([len(example) for example in label_examples]))
+        resampled[label] = np.stack([resample(example, length) for example in label_examples])
+
+    def distances(group, candidate):
+        band = max(1, int(np.ceil(warp * group.shape[1])))
+        return banded_dtw(group, resample(candidate, group.shape[1]), band) / group.shape[1]
+
+    templates = []
+    for label, group in resampled.items():
+        if len(group) > 1:
+            nearest = [np.delete(distances(group, example), i).min() for i, example in enumerate(group)]
+            threshold = threshold_factor * max(nearest)
+        else:
+            threshold = 0.25 * float((group[0] ** 2).sum(axis=-1).mean())
+        others = [distances(group, example).min() for other, other_group in resampled.items() if other != label for example in other_group]
+        if others:
+            threshold = min(threshold, 0.9 * min(others))
+        templates.extend(GestureTemplate(label, example, float(threshold)) for example in group)
+    return templates
+
+
+def match_session(session, templates, frames_config, warp=DEFAULT_WARP, dsp_config=None, calibrate=True):
+    # Replays a recorded session through the matcher; returns the matches with session times
+    frames = GestureFrames.from_config(frames_config)
+    all_frames, frame_end = session_frames(session, frames, dsp_config, calibrate)
+    matcher = TemplateMatcher(templates, warp=warp)
+    times = np.asarray(session.timestamps)[frame_end - 1] if len(frame_end) else None
+    return matcher.push(all_frames, times), matcher.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build custom gesture templates from labelled recordings, or replay recordings through them")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="turn each hotkey-labelled interval into a template")
+    build_parser.add_argument('path', help="session directory or a directory of sessions")
+    build_parser.add_argument('-o', '--output', default='gestures.json', help="template file")
+    build_parser.add_argument('--source', choices=SOURCES, default='envelope', help="smoothed envelope frames or per-window RMS features")
+    build_parser.add_argument('--decimate', type=int, default=4, help="envelope source: samples per frame")
+    build_parser.add_argument('--smoothing-ms', type=float, default=50, help="envelope time constant")
+    build_parser.add_argument('--warp', type=float, default=DEFAULT_WARP, help="Sakoe-Chiba band as a fraction of the template length")
+    build_parser.add_argument('--threshold-factor', type=float, default=DEFAULT_THRESHOLD_FACTOR)
+    build_parser.add_argument('--ignore', nargs='*', default=['REST'], help="labels that are not gestures")
+
+    match_parser = subparsers.add_parser('match', help="print the gestures recognised in recorded sessions")
+    match_parser.add_argument('path', help="session directory or a directory of sessions")
+    match_parser.add_argument('-t', '--templates', default='gestures.json', help="template file")
+
+    for subparser in (build_parser, match_parser):
+        subparser.add_argument('--no-calibration', action='store_true', help="ignore the calibration stored with each session")
+        subparser.add_argument('--config', default='myo_config.yaml', help="config file with the dsp section used live")
+    args = parser.parse_args()
+
+    dsp_config = {}
+    if os.path.exists(args.config):
+        import yaml
+        with open(args.config, 'r') as stream:
+            dsp_config = (yaml.safe_load(stream) or {}).get('dsp') or {}
+    session_paths = find_sessions(args.path)
+    if not session_paths:
+        print(f"No sessions found in {args.path}")
+        sys.exit(1)
+    calibrate = not args.no_calibration
+
+    if args.command == 'build':
+        session = open_session(session_paths[0])
+        frames = GestureFrames(channels=session.channels, sample_rate=session.sample_rate, source=args.source, decimate=args.decimate,
+                               smoothing_ms=args.smoothing_ms, window=dsp_config.get('feature_window', 40), hop=dsp_config.get('feature_hop', 20))
+        examples = collect_examples(session_paths, frames, dsp_config, calibrate, ignore=set(args.ignore))
+        if not examples:
+            print("No labelled gesture examples found, label them with the hotkeys while recording")
+            sys.exit(1)
+        try:
+            templates = build_templates(examples, warp=args.warp, threshold_factor=args.threshold_factor)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        save_templates(args.output, templates, frames.config(), warp=args.warp)
+        for label in sorted(examples):
+            label_templates = [template for template in templates if template.name == label]
+            print(f"  {label}: {len(label_templates)} example(s), {len(label_templates[0].frames) / frames.frame_rate:.2f} s, "
+                  f"threshold {label_templates[0].threshold:.4g}")
+        print(f"Wrote {len(templates)} templates to {args.output}")
+    else:
+        try:
+            templates, frames_config, warp = load_templates(args.templates)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        for session_path in session_paths:
+            session = open_session(session_path)
+            matches, stats = match_session(session, templates, frames_config, warp, dsp_config, calibrate)
+            print(f"{session_path}: {len(matches)} gesture(s), {stats['lb_pruned']} of {stats['evaluated']} comparisons pruned by LB_Keogh, "
+                  f"{stats['abandoned']} abandoned early")
+            for match in matches:
+                print(f"  {match.timestamp:9.2f} s  {match.name}  (distance {match.distance:.4g})")
+
+
+if __name__ == '__main__':
+    main()
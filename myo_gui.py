@@ -1,94 +1,36 @@
-import asyncio, time, struct, yaml
-import dearpygui.dearpygui as dpg
-from bleak import BleakClient, BleakError
-
-
-CLASSIFIER_EVENT_TYPES = {
-    1: 'ARM_SYNCED',
-    2: 'ARM_UNSYNCED',
-    3: 'POSE',
-    4: 'UNLOCKED',
-    5: 'LOCKED',
-    6: 'SYNC_FAILED',
-    7: 'UNKNOWN', # I've only seen this once
-}
-
-ARM_VALUES = {
-    0: 'UNKNOWN',
-    1: 'RIGHT',
-    2: 'LEFT',
-    255: 'UNKNOWN',
-}
-
-POSE_VALUES = {
-    0: 'REST',
-    1: 'FIST',
-    2: 'WAVE_IN',
-    3: 'WAVE_OUT',
-    4: 'FINGERS_SPREAD',
-    5: 'DOUBLE_TAP',
-    255: 'UNKNOWN'
-}
-
-XDIRECTION_VALUES = {
-    1: 'TOWARD_WRIST',
-    2: 'TOWARD_ELBOW',
-    255: 'UNKNOWN'
-}
-
-
-
-
-COMMAND = {
-    'SET_EMG_IMU_MODE':   1, # Set EMG and IMU and Classifier modes
-    'VIBRATE':            3, # Vibrate
-    'DEEP_SLEEP':         4, # Put Myo into deep sleep
-    'LED':                6, # Set LED mode
-    'EXTENDED_VIBRATION': 7, # Extended vibrate
-    'SET_SLEEP_MODE':     9, # Set sleep mode
-    'UNLOCK':            10, # Unlock Myo
-    'USER_ACTION':       11, # Notify user that an action has been recognized / confirmed
-}  
-
-# Myo samples at a constant rate of 200 HZ
-EMG_MODE = {
-    'OFF':           0, # Do not send EMG data
-    'FILTERED_50HZ': 1, # Undocumented filtered 50Hz
-    'FILTERED':      2, # Send filtered EMG data
-    'RAW':           3, # Send raw (unfiltered) EMG data
-}
-
-IMU_MODE = {
-    'OFF':           0, # Do not send IMU data or events
-    'SEND_DATA':     1, # Send IMU data streams (accelerometer, gyroscope, and orientation)
-    'SEND_EVENTS':   2, # Send motion events detected by the IMU (e.g. taps)
-    'SEND_ALL':      3, # Send both IMU data streams and motion events
-    'SEND_RAW':      4, # Send raw IMU data streams 
-}
-
-VIBRATION_DURATION = {
-    'NONE':         0, # Do not vibrate
-    'SHORT':        1, # Vibrate for a short amount of time
-    'MEDIUM':       2, # Vibrate for a medium amount of time
-    'LONG':         3, # Vibrate for a long amount of time
-}
-
-SLEEP_MODE = {
-    'NORMAL':        0, # Normal sleep mode; Myo will sleep after a period of inactivity
-    'NEVER_SLEEP':   1, # Never go to sleep
-}
-
-UNLOCK_COMMAND = {
-    'UNLOCK_RELOCK': 0, # Unlock then re-lock immediately
-    'UNLOCK_TIMED':  1, # Unlock now and re-lock after a fixed timeout
-    'UNLOCK_HOLD':   2, # Unlock now and remain unlocked until a lock command is received
-}
-
-CLASSIFIER_MODE = {
-    'DISABLED':      0, # Disable and reset the internal state of the onboard classifier
-    'ENABLED':       1, # Send classifier events (poses and arm events)
-}
-
+import asyncio, os, re, time, struct
+import numpy as np
+from myo_metrics import PipelineMetrics, MetricsExporter, PacketRateTracker, watch_event_loop_lag
+from myo_profiling import profiler
+from myo_spectrum import StreamingSpectrum
+from myo_recording import SessionRecorder, new_session_path
+from myo_compressed import CompressedSessionRecorder
+from myo_load_shedding import LoadShedder
+from myo_pyramid import MinMaxPyramid, PYRAMID_FILE
+from myo_dsp import DSPPipeline, FEATURE_NAMES
+from myo_onset import OnsetDetector
+from myo_calibration import CalibrationSession, load_calibration, save_calibration
+from myo_quantiles import RecentQuantiles, axis_limits
+from myo_correlation import StreamingCorrelation
+from myo_streams import StreamHub, classifier_record, onset_records
+from myo_labels import LABEL_EVENT
+from myo_gestures import GestureFrames, TemplateMatcher, load_templates
+from myo_protocol import (COMMAND, EMG_MODE, IMU_MODE, CLASSIFIER_MODE, decode_battery, decode_classifier,
+                          decode_filtered_50hz, decode_imu)
+
+# dearpygui and bleak are imported when the window is created, so importing this module
+# (e.g. for EMGGUI's pipeline pieces) doesn't load a GUI toolkit or a BLE stack
+dpg = None
+
+HOTKEY_PATTERN = re.compile(r'[0-9A-Z]|F([1-9]|1[0-2])') # key names accepted in labeling.hotkeys
+
+
+def import_gui():
+    global dpg
+    if dpg is None:
+        import dearpygui.dearpygui
+        dpg = dearpygui.dearpygui
+    return dpg
 
 
 class EMGGUI():
@@ -107,6 +49,7 @@ class EMGGUI():
         self.firmware_revision = '0.0.0.0'
         self.device_config = device_config
         self.device_uuid = ''
+        self.serial_number = ''
         self.client = None
 
         self.command_characteristic = device_config['myo_armband']['characteristics']['command']
@@ -131,8 +74,130 @@ class EMGGUI():
             self.emg_x_axis.append([0] * self.window_size)
             self.emg_y_axis.append([0] * self.window_size)
 
-
-        dpg.create_context()    
+        # Pipeline instrumentation is always collected; exporting and the stats panel are optional
+        metrics_config = device_config.get('metrics') or {}
+        self.metrics = PipelineMetrics()
+        self.metrics.queue_depth.set_function(self.emg_data_queue.qsize)
+        self.metrics_exporter = None
+        if metrics_config.get('http_port') or metrics_config.get('file_path'):
+            self.metrics_exporter = MetricsExporter(self.metrics,
+                                                    http_port=metrics_config.get('http_port'),
+                                                    file_path=metrics_config.get('file_path'),
+                                                    interval=metrics_config.get('file_interval', 5))
+        self.show_stats_panel = bool(metrics_config.get('show_stats_panel', False))
+
+        # Decoded data goes out through the stream hub, the plots are one of its subscribers.
+        # All GUI streams are timestamped on the EMG sample clock (seconds since connecting).
+        streams_config = device_config.get('streams') or {}
+        self.streams = StreamHub(metrics=self.metrics)
+        self.streams.subscribe('emg', self.append_plot_samples, maxsize=streams_config.get('plot_queue_size', 64),
+                               coalesce=True, name='plots')
+
+        # Opt-in per-stage latency histograms
+        profiling_config = device_config.get('profiling') or {}
+        if profiling_config.get('enabled', False):
+            profiler.enable()
+            profiler.install_dump_handlers(path=profiling_config.get('dump_path'),
+                                           on_signal=profiling_config.get('dump_on_signal', True),
+                                           at_exit=profiling_config.get('dump_at_exit', True))
+        self.pending_plot_since = None
+        self.stats_history_size = 120
+        self.rssi_history = []
+        self.battery_history = []
+
+        # Robust y-axis limits from streaming quantiles of the recent signal
+        plots_config = device_config.get('plots') or {}
+        self.plot_autoscale = bool(plots_config.get('autoscale', True))
+        self.plot_quantiles = RecentQuantiles(channels=self.emg_channels, sample_rate=200,
+                                              window_seconds=plots_config.get('autoscale_seconds', 10))
+        low, high = plots_config.get('autoscale_percentiles', [0.5, 99.5])
+        self.plot_autoscale_range = (low / 100, high / 100)
+        self.plot_autoscale_interval = plots_config.get('autoscale_interval', 0.25)
+        self.plot_limits = ([-128] * 8, [127] * 8)
+        self.plot_limits_updated = 0
+
+        # Live PSD / spectrogram, only computed while the spectrum panel is visible
+        spectrum_config = device_config.get('spectrum') or {}
+        self.spectrum = StreamingSpectrum(channels=self.emg_channels,
+                                          sample_rate=200,
+                                          frame_size=spectrum_config.get('frame_size', 128),
+                                          hop_size=spectrum_config.get('hop_size', 16),
+                                          history_frames=spectrum_config.get('history_frames', 250))
+        self.show_spectrum_panel = bool(spectrum_config.get('show_panel', False))
+        self.spectrum_channel = 0
+
+        recording_config = device_config.get('recording') or {}
+        self.recording_directory = recording_config.get('directory', 'recordings')
+        self.recording_format = recording_config.get('format', 'raw')
+        self.recording_codec = recording_config.get('codec', 'zlib')
+        self.recording_chunk_seconds = recording_config.get('chunk_seconds', 10)
+        self.recorder = None
+
+        # Whole-session min/max history for the zoomable history panel (reset when a recording starts)
+        self.history = MinMaxPyramid(channels=self.emg_channels, sample_rate=200)
+        self.show_history_panel = False
+        self.history_follow = True
+        self.history_channel = 0
+        self.history_plot_points = 900
+
+        # Same filtering and windowed features as the offline batch tool (myo_batch.py)
+        self.dsp = DSPPipeline.from_config(device_config.get('dsp'), channels=self.emg_channels, sample_rate=200)
+        self.latest_features = np.zeros((self.emg_channels, len(FEATURE_NAMES)), dtype=np.float32)
+
+        # Low-latency contraction onset/offset events, much faster than the onboard POSE event
+        onset_config = device_config.get('onset') or {}
+        self.onset_enabled = bool(onset_config.get('enabled', True))
+        self.onset_detector = OnsetDetector(channels=self.emg_channels, sample_rate=200,
+                                            envelope_ms=onset_config.get('envelope_ms', 15),
+                                            on_factor=onset_config.get('on_factor', 12.0),
+                                            off_factor=onset_config.get('off_factor', 3.0),
+                                            refractory_ms=onset_config.get('refractory_ms', 100))
+
+        # Inter-channel correlation of the filtered EMG, for cross-talk and synergies
+        correlation_config = device_config.get('correlation') or {}
+        self.correlation = StreamingCorrelation(channels=self.emg_channels, sample_rate=200,
+                                                half_life_seconds=correlation_config.get('half_life_seconds', 2.0),
+                                                rectify=bool(correlation_config.get('rectify', False)),
+                                                publish_every=correlation_config.get('publish_every', 20))
+        self.show_correlation_panel = bool(correlation_config.get('show_panel', False))
+
+        # Per-device normalisation applied to everything downstream of recording and plotting
+        calibration_config = device_config.get('calibration') or {}
+        self.calibration_directory = calibration_config.get('directory', 'calibration')
+        self.calibration_rest_seconds = calibration_config.get('rest_seconds', 5)
+        self.calibration_mvc_seconds = calibration_config.get('mvc_seconds', 5)
+        self.calibration = None
+        self.calibration_session = None
+
+        # Number keys mark what the wearer is doing; written to the recording as label events
+        labeling_config = device_config.get('labeling') or {}
+        self.label_hotkeys = {str(key).upper(): str(label) for key, label in (labeling_config.get('hotkeys') or {}).items()}
+        unknown = sorted(key for key in self.label_hotkeys if not HOTKEY_PATTERN.fullmatch(key))
+        if unknown:
+            raise ValueError(f"labeling.hotkeys: unknown key(s) {', '.join(unknown)} (expected 0-9, A-Z or F1-F12)")
+        self.current_label = None
+
+        # Custom gestures recognised from templates built with myo_gestures.py
+        gestures_config = device_config.get('gestures') or {}
+        templates_path = gestures_config.get('templates')
+        self.gesture_frames = None
+        self.gesture_matcher = None
+        if templates_path and os.path.exists(templates_path):
+            templates, frames_config, warp = load_templates(templates_path)
+            self.gesture_frames = GestureFrames.from_config(frames_config)
+            self.gesture_matcher = TemplateMatcher(templates, warp=warp, stride=gestures_config.get('stride', 1))
+            print(f"Loaded {len(templates)} gesture templates from {templates_path}")
+
+        # Shed plot resolution/refresh (then DSP) when the event loop falls behind
+        load_config = device_config.get('load_shedding') or {}
+        self.load_shedder = LoadShedder(escalate_lag=load_config.get('escalate_lag', 0.05),
+                                        recover_lag=load_config.get('recover_lag', 0.02),
+                                        recover_after=load_config.get('recover_after', 2.0),
+                                        max_queue_depth=load_config.get('max_queue_depth', 200))
+        self.load_shedding_enabled = bool(load_config.get('enabled', True))
+        self.load_shedder.add_callback(self.degradation_changed)
+
+        import_gui().create_context()    
 
     def build_gui(self):
         with dpg.font_registry():
@@ -201,6 +266,13 @@ class EMGGUI():
             dpg.bind_item_font(dpg.last_item(), font_regular_14)
             dpg.bind_item_theme(dpg.last_item(), connection_connecting_button_theme)            
 
+            dpg.add_text("Pipeline Load:", pos=[40, 125])
+            dpg.bind_item_font(dpg.last_item(), font_regular_12)
+            dpg.add_button(label=self.load_shedder.name, pos=[155, 123], width=150, tag="load_status")
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+            dpg.bind_item_theme(dpg.last_item(), connection_connected_button_theme)
+            self.load_status_themes = (connection_connected_button_theme, connection_disconnected_button_theme)
+
             with dpg.child_window(height=100, width=200, pos=[35, 160]):
                 dpg.add_text("Battery Level", pos=[10, 10])
                 dpg.bind_item_theme(dpg.last_item(), center_button_theme)
@@ -250,6 +322,43 @@ class EMGGUI():
             dpg.bind_item_font(dpg.last_item(), font_regular_14)
             dpg.bind_item_theme(dpg.last_item(), input_theme)
 
+            dpg.add_button(label="Pipeline Stats", width=120, pos=[40, 500], tag="stats_button", callback=self.toggle_stats_panel)
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+
+            dpg.add_button(label="Spectrum", width=120, pos=[40, 545], tag="spectrum_button", callback=self.toggle_spectrum_panel)
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+
+            dpg.add_button(label="History", width=120, pos=[40, 635], tag="history_button", callback=self.toggle_history_panel)
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+
+            dpg.add_button(label="Record", width=120, pos=[40, 590], tag="record_button", callback=self.toggle_recording)
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+            dpg.add_text("", pos=[170, 593], tag="record_status")
+            dpg.bind_item_font(dpg.last_item(), font_regular_12)
+
+            dpg.add_text("Active", pos=[40, 680])
+            dpg.bind_item_font(dpg.last_item(), font_regular_12)
+            dpg.add_text("-", pos=[90, 680], tag="activation_display")
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+
+            dpg.add_button(label="Calibrate", width=120, pos=[40, 725], tag="calibrate_button", callback=self.start_calibration)
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+            dpg.add_text("Not calibrated", pos=[170, 728], tag="calibration_status")
+            dpg.bind_item_font(dpg.last_item(), font_regular_12)
+
+            dpg.add_button(label="Correlation", width=120, pos=[40, 770], tag="correlation_button", callback=self.toggle_correlation_panel)
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+
+            dpg.add_text("Label", pos=[40, 815])
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+            dpg.add_text("-", pos=[90, 815], tag="label_display")
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+
+            dpg.add_text("Gesture", pos=[40, 850])
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+            dpg.add_text("-", pos=[105, 850], tag="gesture_display")
+            dpg.bind_item_font(dpg.last_item(), font_regular_14)
+
             dpg.add_button(label="Deep Sleep", width=120, height=40, pos=[40, 900], show=True, tag="sleep_button",callback=self.put_to_sleep)
             dpg.bind_item_font(dpg.last_item(), font_regular_14)
             dpg.bind_item_theme(dpg.last_item(), stop_button_theme)
@@ -297,6 +406,68 @@ class EMGGUI():
                     dpg.add_plot_axis(dpg.mvYAxis, tag="y_axis8")
                     dpg.add_line_series([], [], label="signal", parent="y_axis8", tag="signal_series8")
 
+        with dpg.window(label="Pipeline Stats", tag="stats_window", width=380, height=520, pos=[20, 540], show=self.show_stats_panel):
+            dpg.add_text("", tag="stats_packet_rates")
+            dpg.add_text("", tag="stats_queue")
+            dpg.add_text("", tag="stats_timings")
+            dpg.add_text("", tag="stats_loop_lag")
+            dpg.add_text("", tag="stats_features")
+            with dpg.plot(label="RSSI (dBm)", height=140, width=-1):
+                dpg.add_plot_axis(dpg.mvXAxis, tag="stats_rssi_x", no_tick_labels=True)
+                dpg.add_plot_axis(dpg.mvYAxis, tag="stats_rssi_y")
+                dpg.add_line_series([], [], parent="stats_rssi_y", tag="stats_rssi_series")
+            with dpg.plot(label="Battery (%)", height=140, width=-1):
+                dpg.add_plot_axis(dpg.mvXAxis, tag="stats_battery_x", no_tick_labels=True)
+                dpg.add_plot_axis(dpg.mvYAxis, tag="stats_battery_y")
+                dpg.add_line_series([], [], parent="stats_battery_y", tag="stats_battery_series")
+
+
+        with dpg.window(label="Spectrum", tag="spectrum_window", width=620, height=640, pos=[400, 200], show=self.show_spectrum_panel):
+            dpg.add_combo([f"EMG Signal {i + 1}" for i in range(self.emg_channels)], default_value="EMG Signal 1", width=160, callback=self.spectrum_channel_callback)
+            with dpg.group(horizontal=True):
+                with dpg.plot(label="Spectrogram", height=300, width=540):
+                    dpg.add_plot_axis(dpg.mvXAxis, label="frames", tag="spectrogram_x", no_tick_labels=True)
+                    with dpg.plot_axis(dpg.mvYAxis, label="Hz", tag="spectrogram_y"):
+                        dpg.add_heat_series([-60.0] * (self.spectrum.bins * self.spectrum.history_frames),
+                                            rows=self.spectrum.bins, cols=self.spectrum.history_frames,
+                                            scale_min=-30, scale_max=30, format="",
+                                            bounds_min=(0, 0), bounds_max=(self.spectrum.history_frames, self.spectrum.sample_rate / 2),
+                                            tag="spectrogram_series")
+                dpg.add_colormap_scale(min_scale=-30, max_scale=30, height=300)
+            with dpg.plot(label="PSD (dB)", height=260, width=-1):
+                dpg.add_plot_legend()
+                dpg.add_plot_axis(dpg.mvXAxis, label="Hz", tag="psd_x")
+                dpg.add_plot_axis(dpg.mvYAxis, tag="psd_y")
+                for i in range(self.emg_channels):
+                    dpg.add_line_series([], [], label=str(i + 1), parent="psd_y", tag=f"psd_series{i + 1}")
+
+        with dpg.window(label="Session History", tag="history_window", width=1000, height=420, pos=[400, 300], show=self.show_history_panel):
+            with dpg.group(horizontal=True):
+                dpg.add_combo([f"EMG Signal {i + 1}" for i in range(self.emg_channels)], default_value="EMG Signal 1", width=160, callback=self.history_channel_callback)
+                dpg.add_checkbox(label="Follow (uncheck to scroll and zoom)", default_value=self.history_follow, tag="history_follow", callback=self.history_follow_callback)
+            with dpg.plot(height=-1, width=-1):
+                dpg.add_plot_axis(dpg.mvXAxis, label="seconds", tag="history_x")
+                dpg.add_plot_axis(dpg.mvYAxis, tag="history_y")
+                dpg.add_line_series([], [], label="min/max", parent="history_y", tag="history_series")
+
+        with dpg.window(label="Channel Correlation", tag="correlation_window", width=520, height=480, pos=[500, 250], show=self.show_correlation_panel):
+            with dpg.group(horizontal=True):
+                with dpg.plot(height=440, width=440):
+                    channel_ticks = tuple((str(i + 1), i + 0.5) for i in range(self.emg_channels))
+                    dpg.add_plot_axis(dpg.mvXAxis, tag="correlation_x", no_gridlines=True)
+                    dpg.set_axis_ticks("correlation_x", channel_ticks)
+                    with dpg.plot_axis(dpg.mvYAxis, tag="correlation_y", no_gridlines=True):
+                        dpg.set_axis_ticks("correlation_y", tuple((label, self.emg_channels - y) for label, y in channel_ticks))
+                        dpg.add_heat_series([0.0] * (self.emg_channels * self.emg_channels),
+                                            rows=self.emg_channels, cols=self.emg_channels,
+                                            scale_min=-1, scale_max=1, format="%.2f",
+                                            bounds_min=(0, 0), bounds_max=(self.emg_channels, self.emg_channels),
+                                            tag="correlation_series")
+                dpg.add_colormap_scale(min_scale=-1, max_scale=1, height=440)
+
+        with dpg.handler_registry():
+            for key in sorted(set(self.label_hotkeys) | {'0'}):
+                dpg.add_key_press_handler(key=getattr(dpg, f"mvKey_{key}"), user_data=key, callback=self.label_hotkey_callback)
 
         dpg.create_viewport(title='EMG', width=1440, height=1064, x_pos=40, y_pos=40)
         dpg.bind_item_theme(window, data_theme)
@@ -306,6 +477,109 @@ class EMGGUI():
         dpg.set_primary_window("main_window", True)
 
 
+    def toggle_stats_panel(self, sender, data):
+        self.show_stats_panel = not self.show_stats_panel
+        dpg.configure_item("stats_window", show=self.show_stats_panel)
+
+    def toggle_spectrum_panel(self, sender, data):
+        self.show_spectrum_panel = not self.show_spectrum_panel
+        if self.show_spectrum_panel:
+            self.spectrum.reset()
+        dpg.configure_item("spectrum_window", show=self.show_spectrum_panel)
+
+    def spectrum_channel_callback(self, sender, data):
+        self.spectrum_channel = int(data.split()[-1]) - 1
+
+    def start_calibration(self, sender, data):
+        if self.calibration_session is None:
+            self.loop.create_task(self.run_calibration())
+
+    async def run_calibration(self):
+        self.calibration_session = CalibrationSession(channels=self.emg_channels, serial_number=self.serial_number)
+        try:
+            for phase, seconds, prompt in (('rest', self.calibration_rest_seconds, "Relax your arm"),
+                                           ('mvc', self.calibration_mvc_seconds, "Squeeze as hard as you can")):
+                self.calibration_session.start_phase(phase)
+                for remaining in range(int(seconds), 0, -1):
+                    dpg.set_value("calibration_status", f"{prompt}... {remaining}")
+                    await asyncio.sleep(1)
+                self.calibration_session.finish_phase()
+            if not self.calibration_session.complete:
+                dpg.set_value("calibration_status", "No EMG data, is EMG mode on?")
+                return
+            self.apply_calibration(self.calibration_session.result())
+            path = save_calibration(self.calibration, self.calibration_directory)
+            print(f"Saved calibration to {path}")
+        finally:
+            self.calibration_session = None
+
+    def apply_calibration(self, calibration):
+        self.calibration = calibration
+        self.dsp.reset()
+        self.onset_detector.reset()
+        dpg.set_value("calibration_status", f"Calibrated ({calibration.serial_number or 'unknown device'})")
+
+    def toggle_correlation_panel(self, sender, data):
+        self.show_correlation_panel = not self.show_correlation_panel
+        if self.show_correlation_panel and not self.streams.has_subscribers('correlation'):
+            self.correlation.reset() # nothing was pushed while hidden
+        dpg.configure_item("correlation_window", show=self.show_correlation_panel)
+
+    def label_hotkey_callback(self, sender, data, key):
+        # 0, or the key of the active label, stops labelling
+        label = self.label_hotkeys.get(key)
+        self.set_label(None if label == self.current_label else label)
+
+    def set_label(self, label):
+        if label == self.current_label:
+            return
+        self.current_label = label
+        if self.recorder is not None:
+            if label is None:
+                self.recorder.record_event(LABEL_EVENT, action='stop')
+            else:
+                self.recorder.record_event(LABEL_EVENT, label=label, action='start')
+        dpg.set_value("label_display", label or "-")
+
+    def toggle_history_panel(self, sender, data):
+        self.show_history_panel = not self.show_history_panel
+        dpg.configure_item("history_window", show=self.show_history_panel)
+
+    def history_channel_callback(self, sender, data):
+        self.history_channel = int(data.split()[-1]) - 1
+
+    def history_follow_callback(self, sender, data):
+        self.history_follow = data
+
+    def toggle_recording(self, sender, data):
+        if self.recorder is None:
+            path = new_session_path(self.recording_directory)
+            self.history.reset() # keep the history aligned with the recording so it can be saved next to it
+            recorder_options = dict(channels=self.emg_channels, device_uuid=self.device_uuid, serial_number=self.serial_number,
+                                    calibration=self.calibration.to_dict() if self.calibration is not None else None)
+            if self.recording_format == 'compressed':
+                self.recorder = CompressedSessionRecorder(path, codec=self.recording_codec, chunk_seconds=self.recording_chunk_seconds,
+                                                          **recorder_options)
+            else:
+                self.recorder = SessionRecorder(path, **recorder_options)
+            if self.current_label is not None:
+                self.recorder.record_event(LABEL_EVENT, label=self.current_label, action='start')
+            dpg.configure_item("record_button", label="Stop Recording")
+            dpg.set_value("record_status", path)
+            print(f"Recording to {path}")
+        else:
+            self.stop_recording()
+
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        self.recorder.close()
+        self.history.save(os.path.join(self.recorder.path, PYRAMID_FILE))
+        print(f"Recorded {self.recorder.sample_count} samples to {self.recorder.path}")
+        self.recorder = None
+        dpg.configure_item("record_button", label="Record")
+        dpg.set_value("record_status", "")
+
     def put_to_sleep(self, sender, data):
         # Deep sleep command ######################################################################
         # WARNING: This will immediately disconnect and put the Myo into a deep sleep that can only 
@@ -379,74 +653,88 @@ class EMGGUI():
             self.running = True
             self.loop.create_task(self.client.start_notify(self.filtered_50hz_characteristic, self.ble_notification_callback))            
 
+    @property
+    def stream_time(self):
+        return self.t / 1000
+
+    def append_plot_samples(self, batch):
+        x = (batch.timestamps * 1000).tolist()
+        for i in range(self.emg_channels):
+            self.emg_x_axis[i].extend(x)
+            self.emg_y_axis[i].extend(batch.data[:, i].tolist())
+
+    def handle_onset_events(self, events):
+        if self.streams.has_subscribers('onset'):
+            self.streams.publish('onset', [event.timestamp for event in events], onset_records(events))
+        if self.recorder is not None:
+            for event in events:
+                self.recorder.record_event('onset', kind=event.kind, channel=event.channel + 1, envelope=event.envelope)
+        active = [str(channel + 1) for channel in np.flatnonzero(self.onset_detector.active)]
+        dpg.set_value("activation_display", " ".join(active) if active else "-")
+
+    def handle_gesture_match(self, match):
+        # Published like an onboard POSE so classifier consumers can handle both
+        self.streams.publish('gesture', [match.timestamp], classifier_record('POSE', match.name))
+        if self.recorder is not None:
+            self.recorder.record_event('gesture', event='POSE', value=match.name, distance=match.distance)
+        dpg.set_value("gesture_display", match.name)
+
     def handle_battery_notification(self, data):
-        battery_level_value = int.from_bytes(data, 'little')
+        battery_level_value = decode_battery(data)
         self.battery_level = battery_level_value
+        self.metrics.battery.set(battery_level_value)
+        self.streams.publish('battery', [self.stream_time], np.array([battery_level_value], dtype=np.uint8))
+        if self.recorder is not None:
+            self.recorder.record_event('battery', level=battery_level_value)
         dpg.configure_item("battery_level", label=int(battery_level_value))
 
     def handle_classifier_indication(self, data):
-        event_id, value_id, x_direction_id, _, _, _ = struct.unpack('<6B', data) #TODO what are the 3 bytes at the end?
-        classifier_event = CLASSIFIER_EVENT_TYPES[event_id]
-        classifier_value = None
-        x_direction = None
-        match classifier_event:
-            case 'ARM_SYNCED':
-                classifier_value = ARM_VALUES[value_id]
-                x_direction = XDIRECTION_VALUES[x_direction_id]
-            case 'ARM_UNSYNCED':
-                pass
-            case 'POSE':
-                classifier_value = POSE_VALUES[value_id]
-            case 'UNLOCKED':
-                pass
-            case 'LOCKED':
-                pass
-            case 'SYNC_FAILED':
-                pass
-            case _:
-                classifier_event = "Unknown Event"
-        # print_value = f"{classifier_value} " if classifier_value else ""
-        # print_value += f"-- {x_direction}" if x_direction else ""
-        # print(print_value) 
+        classifier_event, classifier_value, x_direction = decode_classifier(data)
+        self.streams.publish('classifier', [self.stream_time], classifier_record(classifier_event, classifier_value, x_direction))
+        if self.recorder is not None:
+            self.recorder.record_event('classifier', event=classifier_event, value=classifier_value, x_direction=x_direction)
         dpg.configure_item("pose_display", label=classifier_value)
 
     def ble_notification_callback(self, handle, data):
+        decode_start = time.perf_counter()
+        self.metrics.packet_counter(handle).inc()
+        self.decode_notification(handle, data)
+        decode_time = time.perf_counter() - decode_start
+        self.metrics.decode_seconds.observe(decode_time)
+        if profiler.enabled:
+            profiler.record('ble_to_decode', decode_time)
+
+    def decode_notification(self, handle, data):
         match handle:
             case 16: # battery notifications
-                self.handle_battery_notification(data)     
-            case 28: # IMU data
-                values = struct.unpack('10h', data)
-                quat = values[:4]
-                acc  = values[4:7]
-                gyro = values[7:10]
-                print(f"IMU: quat: {quat} acc: {acc} gyro: {gyro}")          
+                self.handle_battery_notification(data)
+            case 28: # IMU data, quat (4), acc (3), gyro (3)
+                self.streams.publish('imu', [self.stream_time], decode_imu(data))
             case 34: # classifier notifications
                 self.handle_classifier_indication(data)
             case 38: # undocumented filtered 50hz emg mode
-                values = list(struct.unpack('<8h', data[:16]))
-                emg = values[:8]
-                intensity_candidate = int(data[15]) # This extra byte seems to be a sort of measure of intensity.
-                                                    # Or a measure of how much the sensor is stretched apart.
-                                                    # Maybe its the latter trying to be the former?
-                                                    # The values vary from 0 to 7 and seem to rise with intensity of pose.
-                                                    # This is really only noticeable when making a fist (perhaps because all the muscles tense)
+                emg, intensity_candidate = decode_filtered_50hz(data)
                 print(f"EMG: {emg} - Intensity: {intensity_candidate}")
             case 42: # EMG 0
                 emg0 = list(struct.unpack('<16b', data))
                 emg0.append(0)
-                self.loop.create_task(self.emg_data_queue.put(emg0))
+                emg0.append(time.perf_counter()) # enqueued at, so queue_to_process excludes decoding
+                self.emg_data_queue.put_nowait(emg0) # unbounded, so this never blocks or needs a task
             case 45: # EMG 1
                 emg1 = list(struct.unpack('<16b', data))
                 emg1.append(1)
-                self.loop.create_task(self.emg_data_queue.put(emg1))
+                emg1.append(time.perf_counter()) # enqueued at, so queue_to_process excludes decoding
+                self.emg_data_queue.put_nowait(emg1) # unbounded, so this never blocks or needs a task
             case 48: # EMG 2
                 emg2 = list(struct.unpack('<16b', data))
                 emg2.append(2)
-                self.loop.create_task(self.emg_data_queue.put(emg2))
+                emg2.append(time.perf_counter()) # enqueued at, so queue_to_process excludes decoding
+                self.emg_data_queue.put_nowait(emg2) # unbounded, so this never blocks or needs a task
             case 51: # EMG 3
                 emg3 = list(struct.unpack('<16b', data))
                 emg3.append(3)
-                self.loop.create_task(self.emg_data_queue.put(emg3))
+                emg3.append(time.perf_counter()) # enqueued at, so queue_to_process excludes decoding
+                self.emg_data_queue.put_nowait(emg3) # unbounded, so this never blocks or needs a task
             case _:
                 print(f"Unknown Characteristic: Handle: {handle} Data: {data}")
 
@@ -454,9 +742,19 @@ class EMGGUI():
         asyncio.create_task(self.collect_emg_data())
         asyncio.create_task(self.process_emg_data())
         asyncio.create_task(self.update_plots())
+        asyncio.create_task(watch_event_loop_lag(self.metrics, stop_event=self.shutdown_event, profiler=profiler))
+        asyncio.create_task(self.update_stats_panel())
+        asyncio.create_task(self.update_spectrum_panel())
+        asyncio.create_task(self.update_history_panel())
+        asyncio.create_task(self.update_correlation_panel())
+        asyncio.create_task(self.monitor_load())
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.start()
         while dpg.is_dearpygui_running():
             await asyncio.sleep(0.001)
+            frame_start = time.perf_counter()
             dpg.render_dearpygui_frame()
+            self.metrics.render_frame_seconds.observe(time.perf_counter() - frame_start)
         await asyncio.sleep(0.01)
         self.running = False
         self.shutdown_event.set() 
@@ -466,6 +764,8 @@ class EMGGUI():
     async def process_emg_data(self):
         try:        
             last_recv_characteristic = 0
+            emg_batch = []
+            emg_batch_times = []
             while not self.shutdown_event.is_set():
                 # print(self.emg_data_queue.qsize())
                 if self.running == True and self.emg_data_queue.qsize() > 0:
@@ -474,23 +774,29 @@ class EMGGUI():
                     emg1 = incoming_data[:8]
                     emg2 = incoming_data[8:16]
                     recv_characteristic = incoming_data[16]
+                    if profiler.enabled:
+                        profiler.record('queue_to_process', time.perf_counter() - incoming_data[17])
                     
                     progression = (recv_characteristic - last_recv_characteristic) % 4
                     if progression > 1:
-                        for i in range(1,progression):
-                            # print("packet not received")
-                            self.t += 5
-                            for _ in range(1,8):
-                                self.emg_x_axis[i].append(self.t)
-                                self.emg_y_axis[i].append(0)
+                        # Leave a gap in time for the missing packets rather than inventing samples
+                        self.metrics.dropped_packets.inc(progression - 1)
+                        self.t += 10 * (progression - 1)
                     last_recv_characteristic = recv_characteristic
                     
+                    if self.pending_plot_since is None:
+                        self.pending_plot_since = time.perf_counter()
                     self.t += 10
-                    for i in range(0,8):
-                        self.emg_x_axis[i].append(self.t - 5)
-                        self.emg_x_axis[i].append(self.t)
-                        self.emg_y_axis[i].append(emg1[i])
-                        self.emg_y_axis[i].append(emg2[i])
+
+                    # Hand everything that arrived since the last wake-up to the batch stages at once
+                    emg_batch.append(emg1)
+                    emg_batch.append(emg2)
+                    emg_batch_times.append((self.t - 5) / 1000)
+                    emg_batch_times.append(self.t / 1000)
+                    if self.emg_data_queue.qsize() == 0:
+                        self.process_emg_batch(np.array(emg_batch_times), np.array(emg_batch, dtype=np.int8))
+                        emg_batch = []
+                        emg_batch_times = []
 
                 else:
                     await asyncio.sleep(0.0001)
@@ -498,18 +804,156 @@ class EMGGUI():
             pass
  
 
+    def process_emg_batch(self, timestamps, samples):
+        # timestamps: (n,) seconds, samples: (n, 8) int8 array of consecutive EMG samples
+        self.streams.publish('emg', timestamps, samples)
+        if self.recorder is not None:
+            self.recorder.write(timestamps, samples)
+        self.history.push(samples)
+        self.plot_quantiles.push(samples)
+        if self.calibration_session is not None:
+            self.calibration_session.push(samples)
+        # Recording, history and the spectrum stay in raw units; detectors and features see
+        # calibrated fractions of MVC so they don't need retuning per user
+        normalized = self.calibration.apply(samples) if self.calibration is not None else samples
+        # Onset events are part of delivery rather than DSP, so they aren't shed under load
+        if self.onset_enabled:
+            events = self.onset_detector.process(normalized, timestamps)
+            if events:
+                self.handle_onset_events(events)
+        # DSP is the first thing after recording to go when the pipeline is overloaded
+        if not self.load_shedder.current['dsp']:
+            return
+        filtered, features, _ = self.dsp.process(normalized)
+        if self.show_correlation_panel or self.streams.has_subscribers('correlation'):
+            update = self.correlation.push(filtered, timestamps)
+            if update is not None and self.streams.has_subscribers('correlation'):
+                self.streams.publish('correlation', [update.timestamp], update.correlation[np.newaxis])
+        if self.gesture_matcher is not None:
+            frames, frame_end = self.gesture_frames.process(filtered)
+            if len(frames):
+                # Frames end inside this batch, so frame_end - sample_count - 1 indexes it from the end
+                for match in self.gesture_matcher.push(frames, timestamps[frame_end - self.gesture_frames.sample_count - 1]):
+                    self.handle_gesture_match(match)
+        if len(features):
+            self.latest_features = features[-1]
+        if self.show_spectrum_panel:
+            self.spectrum.push(samples)
+
+    async def update_history_panel(self):
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(0.2)
+            if not self.show_history_panel or self.history.sample_count == 0:
+                continue
+            if self.history_follow:
+                start, end = 0, self.history.sample_count
+            else:
+                x_min, x_max = dpg.get_axis_limits("history_x")
+                start, end = x_min * self.history.sample_rate, x_max * self.history.sample_rate
+            # Only about one plot-width of buckets is read, however far out we're zoomed
+            x, mins, maxs = self.history.query(start, end, max_points=self.history_plot_points)
+            channel = self.history_channel
+            dpg.set_value("history_series", [np.repeat(x, 2).tolist(), np.column_stack([mins[:, channel], maxs[:, channel]]).ravel().astype(float).tolist()])
+            if self.history_follow:
+                dpg.fit_axis_data("history_x")
+                dpg.fit_axis_data("history_y")
+
+    async def update_spectrum_panel(self):
+        frequencies = self.spectrum.frequencies.tolist()
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(0.1)
+            if not self.show_spectrum_panel:
+                continue
+            image = self.spectrum.spectrogram_image(self.spectrum_channel)
+            dpg.set_value("spectrogram_series", [image.ravel().tolist()])
+            psd_db = self.spectrum.psd_db()
+            for i in range(self.emg_channels):
+                dpg.set_value(f"psd_series{i + 1}", [frequencies, psd_db[i].tolist()])
+            dpg.fit_axis_data("psd_x")
+            dpg.fit_axis_data("psd_y")
+
+    async def update_correlation_panel(self):
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(0.2)
+            if not self.show_correlation_panel:
+                continue
+            dpg.set_value("correlation_series", [self.correlation.correlation().ravel().tolist()])
+
+    def degradation_changed(self, level, level_config):
+        print(f"Pipeline load level: {level_config['name']} (plot every {level_config['plot_interval'] * 1000:.0f} ms, "
+              f"1/{level_config['plot_decimation']} of the points, DSP {'on' if level_config['dsp'] else 'paused'})")
+        self.metrics.degradation_level.set(level)
+        dpg.configure_item("load_status", label=level_config['name'])
+        dpg.bind_item_theme("load_status", self.load_status_themes[0 if level == 0 else 1])
+
+    async def monitor_load(self):
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(0.1)
+            if self.load_shedding_enabled:
+                self.load_shedder.observe(self.metrics.event_loop_lag_seconds.get(), self.emg_data_queue.qsize())
+
     async def update_plots(self):
         try:
             while not self.shutdown_event.is_set():
-                await asyncio.sleep(0.01)
+                await asyncio.sleep(self.load_shedder.current['plot_interval'])
+                decimation = self.load_shedder.current['plot_decimation']
+                update_start = time.perf_counter()
+                # Querying the sketches merges them, so the limits only follow them a few times a second
+                if self.plot_autoscale and self.plot_quantiles.count:
+                    if update_start - self.plot_limits_updated >= self.plot_autoscale_interval:
+                        low, high = self.plot_quantiles.quantiles(self.plot_autoscale_range).T
+                        self.plot_limits = axis_limits(low, high)
+                        self.plot_limits_updated = update_start
+                else:
+                    self.plot_limits = ([-128] * 8, [127] * 8)
+                y_min, y_max = self.plot_limits
                 for i in range(0,8):
                     self.emg_x_axis[i] = self.emg_x_axis[i][-self.window_size:]
                     self.emg_y_axis[i] = self.emg_y_axis[i][-self.window_size:] 
-                    dpg.set_value('signal_series' + str(i + 1), [self.emg_x_axis[i], self.emg_y_axis[i]])
+                    dpg.set_value('signal_series' + str(i + 1), [self.emg_x_axis[i][::decimation], self.emg_y_axis[i][::decimation]])
                     dpg.fit_axis_data(   'x_axis' + str(i + 1))
-                    dpg.set_axis_limits( 'y_axis' + str(i + 1), -200, 200) 
+                    dpg.set_axis_limits( 'y_axis' + str(i + 1), float(y_min[i]), float(y_max[i]))
+                update_end = time.perf_counter()
+                self.metrics.plot_update_seconds.observe(update_end - update_start)
+                if profiler.enabled and self.pending_plot_since is not None:
+                    profiler.record('buffer_to_plot', update_end - self.pending_plot_since)
+                self.pending_plot_since = None
         except KeyboardInterrupt:
             pass
+
+    async def update_stats_panel(self):
+        rate_tracker = PacketRateTracker(self.metrics)
+        samples = 0
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(0.5)
+            rates = rate_tracker.rates()
+            samples += 1
+            self.rssi_history = (self.rssi_history + [self.metrics.rssi.get()])[-self.stats_history_size:]
+            self.battery_history = (self.battery_history + [self.metrics.battery.get()])[-self.stats_history_size:]
+            if not self.show_stats_panel:
+                continue
+
+            m = self.metrics
+            def mean_ms(summary):
+                child = summary.children[()]
+                return 1000 * child.sum / child.count if child.count else 0.0
+            rate_text = "\n".join(f"  handle {handle}: {rate:.1f} pkt/s" for handle, rate in sorted(rates.items(), key=lambda kv: int(kv[0])))
+            dpg.set_value("stats_packet_rates", "Packets/sec\n" + (rate_text or "  (none)"))
+            dpg.set_value("stats_queue", f"Queue depth: {m.queue_depth.get()}   Dropped packets: {int(m.dropped_packets.get())}")
+            dpg.set_value("stats_timings", f"Decode: {mean_ms(m.decode_seconds):.3f} ms   "
+                                           f"Plot update: {mean_ms(m.plot_update_seconds):.2f} ms   "
+                                           f"Frame: {mean_ms(m.render_frame_seconds):.2f} ms")
+            dpg.set_value("stats_loop_lag", f"Event loop lag: {1000 * m.event_loop_lag_seconds.get():.2f} ms "
+                                            f"(max {1000 * m.event_loop_lag_summary.children[()].max:.2f} ms)")
+            rms = self.latest_features[:, FEATURE_NAMES.index('rms')]
+            dpg.set_value("stats_features", ("RMS (MVC): " if self.calibration is not None else "RMS: ") + "  ".join(f"{value:.3g}" for value in rms))
+            history_x = list(range(samples - len(self.rssi_history), samples))
+            dpg.set_value("stats_rssi_series", [history_x, self.rssi_history])
+            dpg.set_value("stats_battery_series", [history_x, self.battery_history])
+            dpg.fit_axis_data("stats_rssi_x")
+            dpg.fit_axis_data("stats_rssi_y")
+            dpg.fit_axis_data("stats_battery_x")
+            dpg.set_axis_limits("stats_battery_y", 0, 100)
  
 
     async def collect_emg_data(self):
@@ -519,6 +963,7 @@ class EMGGUI():
         dpg.configure_item("connected_button", show=False)
         dpg.configure_item("connecting_button", show=True)
 
+        from bleak import BleakClient, BleakError
         try:
             async with BleakClient(self.device_uuid) as client:
                 dpg.configure_item("disconnected_button", show=False)
@@ -528,11 +973,15 @@ class EMGGUI():
 
                 # Get signal strength
                 rssi = await client.get_rssi()
+                self.signal_strength = rssi
+                self.metrics.rssi.set(rssi)
+                self.streams.publish('rssi', [self.stream_time], np.array([rssi], dtype=np.int16))
                 dpg.configure_item("signal_strength_value", label=int(rssi))
 
                 # Get battery level and subscribe to notifications for it
                 battery_level_char = await client.read_gatt_char(self.battery_level_characteristic)
                 self.battery_level = int.from_bytes(battery_level_char, 'big')
+                self.metrics.battery.set(self.battery_level)
                 print(f"Battery Level: {self.battery_level}")
                 dpg.configure_item("battery_level", label=int(self.battery_level))
                 await client.start_notify(self.battery_level_characteristic, self.ble_notification_callback)
@@ -550,7 +999,12 @@ class EMGGUI():
                 device_info_char = await client.read_gatt_char(self.device_info_characteristic)
                 info = struct.unpack("<6BHBBBBB7B", device_info_char)
                 serial_number = '-'.join(map(str, info[0:6]))
+                self.serial_number = serial_number
                 print(f"Serial Number: {serial_number}")
+                calibration = load_calibration(self.calibration_directory, serial_number)
+                if calibration is not None:
+                    self.apply_calibration(calibration)
+                    print(f"Loaded calibration for {serial_number}")
                                 
                 # Set the LED to a very nice purple
                 command = COMMAND['LED']
@@ -581,8 +1035,20 @@ class EMGGUI():
 
 
                 try:
+                    rssi_poll_seconds = 5
+                    last_rssi_poll = time.time()
                     while not self.shutdown_event.is_set():
                         await asyncio.sleep(1)
+                        if time.time() - last_rssi_poll >= rssi_poll_seconds:
+                            last_rssi_poll = time.time()
+                            try:
+                                rssi = await client.get_rssi()
+                                self.signal_strength = rssi
+                                self.metrics.rssi.set(rssi)
+                                self.streams.publish('rssi', [self.stream_time], np.array([rssi], dtype=np.int16))
+                                dpg.configure_item("signal_strength_value", label=int(rssi))
+                            except Exception:
+                                pass # Not every backend supports reading RSSI after connecting
 
                 except Exception as e:
                     print(e)
@@ -603,6 +1069,13 @@ class EMGGUI():
             dpg.configure_item("disconnected_button", show=True)                 
             self.running = False
             self.shutdown_event.set()
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.stop()
+            self.streams.close()
+            if self.recorder is not None:
+                self.recorder.close()
+                self.history.save(os.path.join(self.recorder.path, PYRAMID_FILE))
+                self.recorder = None
             time.sleep(0.1)
             for task in asyncio.all_tasks():
                 task.cancel()
@@ -614,13 +1087,18 @@ class EMGGUI():
   
 
 async def main():
+    import yaml
     with open("myo_config.yaml", "r") as stream:
         try:
             device_config = yaml.safe_load(stream)
         except Exception as e:
             print(f"Error reading config file: {e}")
             return
-    emg = EMGGUI(device_config)
+    try:
+        emg = EMGGUI(device_config)
+    except ValueError as e:
+        print(f"Error in config file: {e}")
+        return
     emg.build_gui()
     await emg.run()
 
@@ -0,0 +1,75 @@
+import numpy as np
+
+# Label track of a recorded session: non-overlapping [start, end) sample intervals with a label.
+# It is stored in the session's events.jsonl, so it is written live and survives crashes:
+#   {"type": "label", "sample": 1234, "label": "FIST", "action": "start"}
+#   {"type": "label", "sample": 1634, "action": "stop"}
+# (GUI hotkeys). It can also be derived from the onboard classifier's POSE events, where each
+# pose lasts until the next one.
+
+LABEL_EVENT = 'label'
+SOURCES = ('hotkeys', 'pose')
+
+
+class LabelTrack():
+    def __init__(self, intervals=()):
+        # intervals: iterable of (start_sample, end_sample, label)
+        intervals = sorted((int(start), int(end), str(label)) for start, end, label in intervals if end > start)
+        self.starts = np.array([i[0] for i in intervals], dtype=np.int64)
+        self.ends = np.array([i[1] for i in intervals], dtype=np.int64)
+        self.labels = [i[2] for i in intervals]
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __iter__(self):
+        return iter(zip(self.starts.tolist(), self.ends.tolist(), self.labels))
+
+    @property
+    def classes(self):
+        return sorted(set(self.labels))
+
+    @classmethod
+    def from_events(cls, events, sample_count, source='hotkeys'):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown label source {source}, expected one of {', '.join(SOURCES)}")
+        intervals = []
+        current = None # (start, label)
+        for event in events:
+            if source == 'hotkeys' and event.get('type') == LABEL_EVENT:
+                if current is not None:
+                    intervals.append((current[0], event['sample'], current[1]))
+                    current = None
+                if event.get('action') == 'start':
+                    current = (event['sample'], event['label'])
+            elif source == 'pose' and event.get('type') == 'classifier' and event.get('event') == 'POSE' and event.get('value'):
+                if current is not None:
+                    intervals.append((current[0], event['sample'], current[1]))
+                current = (event['sample'], event['value'])
+        if current is not None:
+            intervals.append((current[0], sample_count, current[1]))
+        return cls(intervals)
+
+    @classmethod
+    def from_session(cls, session, source='hotkeys'):
+        kinds = (LABEL_EVENT,) if source == 'hotkeys' else ('classifier',)
+        return cls.from_events(session.events(kinds=kinds), session.sample_count, source)
+
+    def interval_index(self, samples):
+        # Index of the interval containing each sample, -1 where unlabelled
+        samples = np.asarray(samples, dtype=np.int64)
+        index = np.searchsorted(self.starts, samples, side='right') - 1
+        inside = (index >= 0) & (samples < self.ends[np.maximum(index, 0)]) if len(self) else np.zeros(samples.shape, dtype=bool)
+        return np.where(inside, index, -1)
+
+    def window_labels(self, window_starts, window, rule='center'):
+        # Interval index per window: 'center' labels by the window's middle sample, 'full' only
+        # labels windows that lie entirely inside one interval
+        window_starts = np.asarray(window_starts, dtype=np.int64)
+        if rule == 'center':
+            return self.interval_index(window_starts + window // 2)
+        if rule == 'full':
+            first = self.interval_index(window_starts)
+            last = self.interval_index(window_starts + window - 1)
+            return np.where(first == last, first, -1)
+        raise ValueError(f"Unknown window label rule {rule}, expected 'center' or 'full'")
@@ -0,0 +1,75 @@
+import time
+
+# Explicit degradation policy for when the machine can't keep up.
+# Work is shed in reverse priority order:
+#   1. recording and subscriber delivery - never shed
+#   2. DSP (spectrum, features, ...)      - paused only at the last level
+#   3. plot resolution and refresh rate   - reduced first
+# The level is driven by event loop lag (and optionally queue depth) with hysteresis:
+# escalate quickly when overloaded, recover one level at a time once things have been calm.
+
+DEGRADATION_LEVELS = [
+    {'name': 'NORMAL',   'plot_interval': 0.01, 'plot_decimation': 1, 'dsp': True},
+    {'name': 'REDUCED',  'plot_interval': 0.02, 'plot_decimation': 2, 'dsp': True},
+    {'name': 'DEGRADED', 'plot_interval': 0.05, 'plot_decimation': 4, 'dsp': True},
+    {'name': 'MINIMAL',  'plot_interval': 0.10, 'plot_decimation': 8, 'dsp': False},
+]
+
+
+class LoadShedder():
+    def __init__(self, levels=None, escalate_lag=0.05, recover_lag=0.02, escalate_after=3, recover_after=2.0,
+                 max_queue_depth=200):
+        self.levels = levels or DEGRADATION_LEVELS
+        self.escalate_lag = escalate_lag        # seconds of loop lag that count as overloaded
+        self.recover_lag = recover_lag          # seconds of loop lag that count as calm
+        self.escalate_after = escalate_after    # consecutive overloaded observations before stepping down
+        self.recover_after = recover_after      # seconds of calm before stepping back up
+        self.max_queue_depth = max_queue_depth  # queue backlog that counts as overloaded
+        self.level = 0
+        self.overloaded_count = 0
+        self.calm_since = None
+        self.callbacks = []
+
+    @property
+    def current(self):
+        return self.levels[self.level]
+
+    @property
+    def name(self):
+        return self.current['name']
+
+    def add_callback(self, callback):
+        # callback(level_index, level_config) is called whenever the level changes
+        self.callbacks.append(callback)
+
+    def set_level(self, level):
+        level = max(0, min(level, len(self.levels) - 1))
+        if level == self.level:
+            return False
+        self.level = level
+        for callback in self.callbacks:
+            callback(level, self.current)
+        return True
+
+    def observe(self, lag, queue_depth=0, now=None):
+        # Feed one measurement; returns True if the level changed
+        now = time.monotonic() if now is None else now
+        overloaded = lag > self.escalate_lag or queue_depth > self.max_queue_depth
+        if overloaded:
+            self.calm_since = None
+            self.overloaded_count += 1
+            if self.overloaded_count >= self.escalate_after:
+                self.overloaded_count = 0
+                return self.set_level(self.level + 1)
+            return False
+
+        self.overloaded_count = 0
+        if lag > self.recover_lag or self.level == 0:
+            self.calm_since = None
+            return False
+        if self.calm_since is None:
+            self.calm_since = now
+        elif now - self.calm_since >= self.recover_after:
+            self.calm_since = now
+            return self.set_level(self.level - 1)
+        return False
@@ -0,0 +1,254 @@
+import asyncio, os, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lightweight always-on pipeline instrumentation.
+# Hot path updates are plain attribute increments on pre-resolved children, so leaving
+# collection enabled costs a few hundred nanoseconds per packet. Rendering to the
+# Prometheus text exposition format only happens when the exporter or stats panel asks for it.
+
+
+def escape_label_value(value):
+    # Prometheus text format: backslash, double quote and newline are escaped in label values
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Child():
+    __slots__ = ('value', 'sum', 'count', 'max', 'function')
+
+    def __init__(self):
+        self.value = 0.0
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        self.function = None
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        # Evaluated only when the metric is read, e.g. queue.qsize
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            return self.function()
+        return self.value
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+
+class Metric():
+    def __init__(self, name, help_text, metric_type, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names)
+        self.children = {}
+        if not self.label_names:
+            self.children[()] = _Child()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = _Child()
+        return child
+
+    # Convenience pass-throughs for unlabelled metrics
+    def inc(self, amount=1):
+        self.children[()].value += amount
+
+    def set(self, value):
+        self.children[()].value = value
+
+    def set_function(self, function):
+        self.children[()].function = function
+
+    def get(self):
+        return self.children[()].get()
+
+    def observe(self, value):
+        self.children[()].observe(value)
+
+    def _label_text(self, key, extra=''):
+        pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(self.label_names, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def render(self):
+        help_text = self.help_text.replace('\\', '\\\\').replace('\n', '\\n') # HELP escapes all but the quote
+        lines = [f"# HELP {self.name} {help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        # Summaries also track their largest observation, exported as a separate gauge family
+        max_lines = [f"# HELP {self.name}_max Largest observation of {self.name}", f"# TYPE {self.name}_max gauge"]
+        for key, child in list(self.children.items()):
+            if self.metric_type == 'summary':
+                lines.append(f"{self.name}_sum{self._label_text(key)} {child.sum}")
+                lines.append(f"{self.name}_count{self._label_text(key)} {child.count}")
+                max_lines.append(f"{self.name}_max{self._label_text(key)} {child.max}")
+            else:
+                lines.append(f"{self.name}{self._label_text(key)} {child.get()}")
+        return lines + max_lines if self.metric_type == 'summary' else lines
+
+
+class MetricsRegistry():
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, name, help_text, metric_type, label_names):
+        if name in self.metrics:
+            return self.metrics[name]
+        metric = Metric(name, help_text, metric_type, label_names)
+        self.metrics[name] = metric
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(name, help_text, 'counter', label_names)
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._register(name, help_text, 'gauge', label_names)
+
+    def summary(self, name, help_text, label_names=()):
+        return self._register(name, help_text, 'summary', label_names)
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class PipelineMetrics():
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else MetricsRegistry()
+        r = self.registry
+        self.packets = r.counter('myo_packets_total', 'BLE notifications received per characteristic handle', ('handle',))
+        self.queue_depth = r.gauge('myo_queue_depth', 'Packets waiting in the EMG queue')
+        self.dropped_packets = r.counter('myo_dropped_packets_total', 'EMG packets missing from the notification sequence')
+        self.decode_seconds = r.summary('myo_decode_seconds', 'Time spent decoding a BLE notification')
+        self.plot_update_seconds = r.summary('myo_plot_update_seconds', 'Time spent pushing data into the plots')
+        self.render_frame_seconds = r.summary('myo_render_frame_seconds', 'Time spent rendering one GUI frame')
+        self.event_loop_lag_seconds = r.gauge('myo_event_loop_lag_seconds', 'Most recent asyncio event loop scheduling lag')
+        self.event_loop_lag_summary = r.summary('myo_event_loop_lag_observed_seconds', 'Observed asyncio event loop scheduling lag')
+        self.rssi = r.gauge('myo_rssi_dbm', 'Signal strength of the connected Myo')
+        self.battery = r.gauge('myo_battery_percent', 'Battery level of the connected Myo')
+        self.degradation_level = r.gauge('myo_degradation_level', 'Load shedding level (0 = normal)')
+        self.subscriber_dropped = r.counter('myo_subscriber_dropped_batches_total', 'Batches dropped from full subscriber queues', ('stream',))
+        self._packets_by_handle = {}
+
+    def packet_counter(self, handle):
+        # Cache the child per handle so the notification callback only does a dict lookup and an add
+        child = self._packets_by_handle.get(handle)
+        if child is None:
+            child = self._packets_by_handle[handle] = self.packets.labels(handle)
+        return child
+
+    def render(self):
+        return self.registry.render()
+
+
+async def watch_event_loop_lag(metrics, interval=0.1, stop_event=None, profiler=None):
+    # Sleep for a fixed interval and record how late the loop woke us up
+    loop = asyncio.get_running_loop()
+    while stop_event is None or not stop_event.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        metrics.event_loop_lag_seconds.set(lag)
+        metrics.event_loop_lag_summary.observe(lag)
+        if profiler is not None and profiler.enabled:
+            profiler.record('loop_stall', lag)
+
+
+class PacketRateTracker():
+    # Turns the monotonically increasing packet counters into packets/sec for display
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.last_time = time.perf_counter()
+        self.last_values = {}
+
+    def rates(self):
+        now = time.perf_counter()
+        elapsed = max(now - self.last_time, 1e-9)
+        rates = {}
+        for key, child in list(self.metrics.packets.children.items()):
+            handle = key[0]
+            value = child.value
+            rates[handle] = (value - self.last_values.get(handle, 0.0)) / elapsed
+            self.last_values[handle] = value
+        self.last_time = now
+        return rates
+
+
+class MetricsExporter():
+    def __init__(self, metrics, http_port=None, file_path=None, interval=5.0, host='127.0.0.1'):
+        self.metrics = metrics
+        self.http_port = http_port
+        self.file_path = file_path
+        self.interval = interval
+        self.host = host
+        self.server = None
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        if self.http_port:
+            metrics = self.metrics
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] not in ('/', '/metrics'):
+                        self.send_error(404)
+                        return
+                    body = metrics.render().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self.server = ThreadingHTTPServer((self.host, self.http_port), MetricsHandler)
+            thread = threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+            print(f"Serving metrics on http://{self.host}:{self.server.server_address[1]}/metrics")
+        if self.file_path:
+            thread = threading.Thread(target=self._write_file_loop, name='metrics-file', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def write_file(self):
+        # Write to a temp file and rename so readers never see a partial exposition
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.metrics.render())
+        os.replace(tmp_path, self.file_path)
+
+    def _write_file_loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.write_file()
+            except OSError as e:
+                print(f"Error writing metrics file: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.file_path:
+            try:
+                self.write_file()
+            except OSError:
+                pass
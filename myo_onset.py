@@ -0,0 +1,134 @@
+from collections import namedtuple
+import numpy as np
+
+# Streaming muscle activation onset/offset detection on decoded EMG.
+# Per batch, for all channels at once:
+#   1. Teager-Kaiser energy operator  psi[n] = x[n]^2 - x[n-1] * x[n+1]   (one sample of look-ahead)
+#   2. one-pole envelope of |psi|, applied to the whole batch as one matrix product
+#   3. adaptive thresholds from an exponentially weighted baseline of the envelope at rest
+#   4. hysteresis (separate on/off thresholds) plus a refractory period after each offset
+# Reacts within a few samples of a contraction instead of waiting for the onboard POSE event.
+
+OnsetEvent = namedtuple('OnsetEvent', ['kind', 'channel', 'sample', 'timestamp', 'envelope'])
+
+
+class OnsetDetector():
+    def __init__(self, channels=8, sample_rate=200, envelope_ms=15, on_factor=12.0, off_factor=3.0,
+                 refractory_ms=100, warmup_ms=500, baseline_ms=2000):
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.alpha = 1 - np.exp(-1000 / (envelope_ms * sample_rate))
+        self.baseline_alpha = 1 - np.exp(-1000 / (baseline_ms * sample_rate))
+        self.on_factor = on_factor
+        self.off_factor = off_factor
+        self.refractory = int(refractory_ms * sample_rate / 1000)
+        self.warmup = int(warmup_ms * sample_rate / 1000)
+        self._envelope_matrices = {}
+        self.reset()
+
+    def reset(self):
+        self.sample_count = 0
+        self._history = np.zeros((0, self.channels), dtype=np.float64) # last input sample(s) for TKEO
+        self.envelope = np.zeros(self.channels)
+        self.baseline_mean = np.zeros(self.channels)
+        self.baseline_dev = np.zeros(self.channels)
+        self.active = np.zeros(self.channels, dtype=bool)
+        self.refractory_until = np.zeros(self.channels, dtype=np.int64)
+
+    @property
+    def thresholds(self):
+        spread = np.maximum(self.baseline_dev, 1e-3)
+        return self.baseline_mean + self.on_factor * spread, self.baseline_mean + self.off_factor * spread
+
+    def _envelope_matrix(self, n):
+        # y[k] = (1-a)^(k+1) y0 + sum_j a (1-a)^(k-j) u[j] as (decay, lower triangular weights)
+        matrix = self._envelope_matrices.get(n)
+        if matrix is None:
+            k = np.arange(n)
+            powers = (1 - self.alpha) ** np.maximum(k[:, None] - k[None, :], 0)
+            weights = np.tril(self.alpha * powers)
+            decay = (1 - self.alpha) ** (k + 1)
+            matrix = self._envelope_matrices[n] = (decay, weights)
+        return matrix
+
+    def _tkeo(self, samples):
+        # Energy for every sample that now has a successor; the newest sample waits for the next batch
+        x = np.concatenate([self._history, samples])
+        if len(x) < 3:
+            self._history = x[-2:]
+            return np.zeros((0, self.channels))
+        energy = np.abs(x[1:-1] ** 2 - x[:-2] * x[2:])
+        self._history = x[-2:]
+        return energy
+
+    def _smooth(self, energy):
+        envelope = np.empty_like(energy)
+        for start in range(0, len(energy), 64):
+            block = energy[start:start + 64]
+            decay, weights = self._envelope_matrix(len(block))
+            envelope[start:start + 64] = weights @ block + decay[:, None] * self.envelope
+            self.envelope = envelope[start + len(block) - 1]
+        return envelope
+
+    def process(self, samples, timestamps=None):
+        # samples: (n, channels). Returns the list of OnsetEvents detected in this batch.
+        samples = np.asarray(samples, dtype=np.float64)
+        if len(samples) == 0:
+            return []
+        batch_start = self.sample_count
+        # Energy row 0 belongs to the sample after the oldest one kept from earlier batches
+        first_sample = batch_start - len(self._history) + 1
+        energy = self._tkeo(samples)
+        self.sample_count += len(samples)
+        if len(energy) == 0:
+            return []
+        envelope = self._smooth(energy)
+        indices = first_sample + np.arange(len(envelope))
+
+        events = []
+        warm = indices >= self.warmup
+        if not warm.any():
+            self._update_baseline(envelope)
+            return events
+        on_threshold, off_threshold = self.thresholds
+        above_on = envelope > on_threshold
+        below_off = envelope < off_threshold
+        for row in np.flatnonzero(warm):
+            starting = above_on[row] & ~self.active & (indices[row] >= self.refractory_until)
+            stopping = below_off[row] & self.active
+            if not starting.any() and not stopping.any():
+                continue
+            for channel in np.flatnonzero(starting):
+                self.active[channel] = True
+                events.append(self._event('ONSET', channel, indices[row], indices[row] - batch_start, timestamps, envelope[row, channel]))
+            for channel in np.flatnonzero(stopping):
+                self.active[channel] = False
+                self.refractory_until[channel] = indices[row] + self.refractory
+                events.append(self._event('OFFSET', channel, indices[row], indices[row] - batch_start, timestamps, envelope[row, channel]))
+
+        # Only learn the baseline from channels that are at rest
+        self._update_baseline(envelope, mask=~self.active & ~above_on.any(axis=0))
+        return events
+
+    def _update_baseline(self, envelope, mask=None):
+        mean = envelope.mean(axis=0)
+        dev = np.abs(envelope - self.baseline_mean).mean(axis=0)
+        if self.sample_count <= self.warmup + len(envelope):
+            # Converge quickly during warm-up
+            weight = len(envelope) / max(self.sample_count, 1)
+        else:
+            weight = 1 - (1 - self.baseline_alpha) ** len(envelope)
+        new_mean = self.baseline_mean + weight * (mean - self.baseline_mean)
+        new_dev = self.baseline_dev + weight * (dev - self.baseline_dev)
+        if mask is None:
+            self.baseline_mean, self.baseline_dev = new_mean, new_dev
+        else:
+            self.baseline_mean = np.where(mask, new_mean, self.baseline_mean)
+            self.baseline_dev = np.where(mask, new_dev, self.baseline_dev)
+
+    def _event(self, kind, channel, sample, batch_index, timestamps, envelope):
+        timestamp = None
+        if timestamps is not None:
+            # The sample may belong to the previous batch because of TKEO's look-ahead
+            timestamp = float(timestamps[max(0, batch_index)])
+        return OnsetEvent(kind, int(channel), int(sample), timestamp, float(envelope))
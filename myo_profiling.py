@@ -0,0 +1,150 @@
+import atexit, json, math, signal, sys, time
+from contextlib import contextmanager
+
+# Opt-in per-stage latency profiling.
+# Call sites guard every measurement with `if profiler.enabled:` so a disabled profiler
+# costs one attribute lookup per packet. When enabled each stage gets a log-bucketed
+# histogram (constant memory, ~4% relative bucket width) and every sample is offered to
+# any registered hooks so external profilers can subscribe.
+
+STAGES = {
+    'ble_to_decode':    'Bleak notification callback until the packet is decoded',
+    'queue_to_process': 'Packet queued until process_emg_data picks it up',
+    'buffer_to_plot':   'Sample buffered until update_plots pushes it to the GUI',
+    'loop_stall':       'asyncio event loop stall duration',
+}
+
+
+class LatencyHistogram():
+    def __init__(self, min_value=1e-6, max_value=10.0, buckets_per_decade=60):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.log_min = math.log(min_value)
+        self.buckets_per_log = buckets_per_decade / math.log(10)
+        self.bucket_count = int(math.ceil(math.log(max_value / min_value) * self.buckets_per_log)) + 1
+        self.counts = [0] * (self.bucket_count + 1) # last bucket collects everything above max_value
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(int((math.log(value) - self.log_min) * self.buckets_per_log) + 1, self.bucket_count)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def bucket_upper_bound(self, index):
+        return math.exp(self.log_min + index / self.buckets_per_log)
+
+    def percentile(self, q):
+        if self.count == 0:
+            return 0.0
+        target = q / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target and count:
+                # Never report more than we've actually seen
+                return min(self.bucket_upper_bound(index), self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Profiler():
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self.hooks = []
+        self.dump_path = None
+        self.started = time.time()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def add_hook(self, hook):
+        # hook(stage, seconds) is called synchronously for every recorded sample
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        if hook in self.hooks:
+            self.hooks.remove(hook)
+
+    def record(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.record(seconds)
+        for hook in self.hooks:
+            hook(stage, seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        return {stage: histogram.snapshot() for stage, histogram in list(self.histograms.items())}
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def format_snapshot(self, snapshot=None):
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        lines = [f"{'stage':<18}{'count':>10}{'p50 ms':>12}{'p99 ms':>12}{'max ms':>12}"]
+        for stage, stats in snapshot.items():
+            lines.append(f"{stage:<18}{stats['count']:>10}{1000 * stats['p50']:>12.3f}{1000 * stats['p99']:>12.3f}{1000 * stats['max']:>12.3f}")
+        return '\n'.join(lines)
+
+    def dump(self, path=None):
+        path = path or self.dump_path
+        snapshot = self.snapshot()
+        if not path:
+            print(self.format_snapshot(snapshot))
+            return
+        with open(path, 'w') as f:
+            if path.endswith('.json'):
+                json.dump({'started': self.started, 'dumped': time.time(), 'stages': snapshot}, f, indent=2)
+            else:
+                f.write(self.format_snapshot(snapshot) + '\n')
+
+    def install_dump_handlers(self, path=None, on_signal=True, at_exit=True):
+        self.dump_path = path
+        if at_exit:
+            atexit.register(self.dump)
+        if on_signal and hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump())
+        elif on_signal:
+            print("Profiler signal dumps are not supported on this platform", file=sys.stderr)
+
+
+# Shared instance used by the live pipeline
+profiler = Profiler()
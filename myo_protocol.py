@@ -0,0 +1,138 @@
+import struct
+import numpy as np
+
+# Myo Bluetooth protocol: notification handles, command and mode values, and decoders that turn
+# notification payloads into the arrays published on a StreamHub. No BLE library is needed to
+# use these, so recordings, simulations and tests can decode packets without a device.
+
+SAMPLE_RATE = 200 # EMG samples per second, whatever the mode
+SAMPLES_PER_PACKET = 2 # each EMG notification carries two consecutive 8 channel samples
+
+BATTERY_HANDLE = 16
+IMU_HANDLE = 28
+CLASSIFIER_HANDLE = 34
+FILTERED_50HZ_HANDLE = 38 # undocumented filtered 50Hz EMG mode
+EMG_HANDLES = (42, 45, 48, 51) # EMG 0-3
+
+CLASSIFIER_EVENT_TYPES = {
+    1: 'ARM_SYNCED',
+    2: 'ARM_UNSYNCED',
+    3: 'POSE',
+    4: 'UNLOCKED',
+    5: 'LOCKED',
+    6: 'SYNC_FAILED',
+    7: 'UNKNOWN', # I've only seen this once
+}
+
+ARM_VALUES = {
+    0: 'UNKNOWN',
+    1: 'RIGHT',
+    2: 'LEFT',
+    255: 'UNKNOWN',
+}
+
+POSE_VALUES = {
+    0: 'REST',
+    1: 'FIST',
+    2: 'WAVE_IN',
+    3: 'WAVE_OUT',
+    4: 'FINGERS_SPREAD',
+    5: 'DOUBLE_TAP',
+    255: 'UNKNOWN'
+}
+
+XDIRECTION_VALUES = {
+    1: 'TOWARD_WRIST',
+    2: 'TOWARD_ELBOW',
+    255: 'UNKNOWN'
+}
+
+COMMAND = {
+    'SET_EMG_IMU_MODE':   1, # Set EMG and IMU and Classifier modes
+    'VIBRATE':            3, # Vibrate
+    'DEEP_SLEEP':         4, # Put Myo into deep sleep
+    'LED':                6, # Set LED mode
+    'EXTENDED_VIBRATION': 7, # Extended vibrate
+    'SET_SLEEP_MODE':     9, # Set sleep mode
+    'UNLOCK':            10, # Unlock Myo
+    'USER_ACTION':       11, # Notify user that an action has been recognized / confirmed
+}
+
+# Myo samples at a constant rate of 200 HZ
+EMG_MODE = {
+    'OFF':           0, # Do not send EMG data
+    'FILTERED_50HZ': 1, # Undocumented filtered 50Hz
+    'FILTERED':      2, # Send filtered EMG data
+    'RAW':           3, # Send raw (unfiltered) EMG data
+}
+
+IMU_MODE = {
+    'OFF':           0, # Do not send IMU data or events
+    'SEND_DATA':     1, # Send IMU data streams (accelerometer, gyroscope, and orientation)
+    'SEND_EVENTS':   2, # Send motion events detected by the IMU (e.g. taps)
+    'SEND_ALL':      3, # Send both IMU data streams and motion events
+    'SEND_RAW':      4, # Send raw IMU data streams
+}
+
+VIBRATION_DURATION = {
+    'NONE':         0, # Do not vibrate
+    'SHORT':        1, # Vibrate for a short amount of time
+    'MEDIUM':       2, # Vibrate for a medium amount of time
+    'LONG':         3, # Vibrate for a long amount of time
+}
+
+SLEEP_MODE = {
+    'NORMAL':        0, # Normal sleep mode; Myo will sleep after a period of inactivity
+    'NEVER_SLEEP':   1, # Never go to sleep
+}
+
+UNLOCK_COMMAND = {
+    'UNLOCK_RELOCK': 0, # Unlock then re-lock immediately
+    'UNLOCK_TIMED':  1, # Unlock now and re-lock after a fixed timeout
+    'UNLOCK_HOLD':   2, # Unlock now and remain unlocked until a lock command is received
+}
+
+CLASSIFIER_MODE = {
+    'DISABLED':      0, # Disable and reset the internal state of the onboard classifier
+    'ENABLED':       1, # Send classifier events (poses and arm events)
+}
+
+
+def decode_emg(data):
+    # 16 signed bytes -> (2, 8) int8 samples
+    return np.frombuffer(bytes(data), dtype=np.int8).reshape(SAMPLES_PER_PACKET, 8)
+
+
+def decode_imu(data):
+    # -> (1, 10) int16: orientation quaternion w, x, y, z, accelerometer x, y, z, gyroscope x, y, z
+    return np.array(struct.unpack('10h', data), dtype=np.int16).reshape(1, 10)
+
+
+def decode_battery(data):
+    return int.from_bytes(data, 'little')
+
+
+def decode_classifier(data):
+    # -> (event, value, x_direction), value and x_direction are None when the event has none
+    event_id, value_id, x_direction_id, _, _, _ = struct.unpack('<6B', data) #TODO what are the 3 bytes at the end?
+    classifier_event = CLASSIFIER_EVENT_TYPES.get(event_id, "Unknown Event")
+    classifier_value = None
+    x_direction = None
+    match classifier_event:
+        case 'ARM_SYNCED':
+            classifier_value = ARM_VALUES[value_id]
+            x_direction = XDIRECTION_VALUES[x_direction_id]
+        case 'POSE':
+            classifier_value = POSE_VALUES[value_id]
+    return classifier_event, classifier_value, x_direction
+
+
+def decode_filtered_50hz(data):
+    # -> (8 EMG values, intensity candidate)
+    emg = list(struct.unpack('<8h', data[:16]))
+    intensity_candidate = int(data[15]) # This extra byte seems to be a sort of measure of intensity.
+                                        # Or a measure of how much the sensor is stretched apart.
+                                        # Maybe its the latter trying to be the former?
+                                        # The values vary from 0 to 7 and seem to rise with intensity of pose.
+                                        # This is really only noticeable when making a fist (perhaps because all the muscles tense)
+    return emg, intensity_candidate
@@ -0,0 +1,218 @@
+import argparse, os
+import numpy as np
+
+# Multi-resolution min/max summary of a whole session.
+# Level k stores the min and max of every block of base_block * fanout**k samples. Levels are
+# filled incrementally as samples arrive (amortised O(1) per sample), so a query at any zoom
+# picks the coarsest level that still gives about one plot-width of points and never touches
+# more than that many buckets, whether the view spans seconds or hours.
+
+PYRAMID_FILE = 'pyramid.npz'
+
+
+class _GrowableArray():
+    def __init__(self, channels, dtype, capacity=1024):
+        self.data = np.zeros((capacity, channels), dtype=dtype)
+        self.count = 0
+
+    def extend(self, values):
+        n = len(values)
+        if self.count + n > len(self.data):
+            grown = np.zeros((max(2 * len(self.data), self.count + n), self.data.shape[1]), dtype=self.data.dtype)
+            grown[:self.count] = self.data[:self.count]
+            self.data = grown
+        self.data[self.count:self.count + n] = values
+        self.count += n
+
+    def view(self):
+        return self.data[:self.count]
+
+
+class MinMaxPyramid():
+    def __init__(self, channels=8, sample_rate=200, base_block=4, fanout=4, dtype=np.int8):
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.base_block = base_block
+        self.fanout = fanout
+        self.dtype = np.dtype(dtype)
+        self.reset()
+
+    def reset(self):
+        self._raw = _GrowableArray(self.channels, self.dtype, capacity=self.sample_rate * 60)
+        self._external_raw = None
+        self._external_count = 0
+        self.mins = []
+        self.maxs = []
+
+    @property
+    def sample_count(self):
+        return self._external_count if self._external_raw is not None else self._raw.count
+
+    def raw(self):
+        return self._external_raw if self._external_raw is not None else self._raw.view()
+
+    def _attach(self, raw, count):
+        # Use the first `count` samples of a recording without slicing it, so compressed sessions
+        # only decode the chunks that are actually read
+        self._external_raw = raw
+        self._external_count = min(count, len(raw))
+
+    def block_size(self, level):
+        return self.base_block * self.fanout ** level
+
+    def push(self, samples):
+        # samples: (n, channels)
+        if self._external_raw is not None:
+            raise RuntimeError("This pyramid is attached to a read-only recording")
+        if len(samples) == 0:
+            return
+        self._raw.extend(np.asarray(samples, dtype=self.dtype))
+        self._update_levels()
+
+    def _update_levels(self):
+        raw = self.raw()
+        source_min = source_max = raw
+        source_count = self.sample_count
+        group = self.base_block
+        level = 0
+        while True:
+            if level == len(self.mins):
+                if source_count < group:
+                    return
+                self.mins.append(_GrowableArray(self.channels, self.dtype, capacity=64))
+                self.maxs.append(_GrowableArray(self.channels, self.dtype, capacity=64))
+            done = self.mins[level].count
+            available = source_count // group
+            if available > done:
+                new_min = source_min[done * group:available * group].reshape(-1, group, self.channels).min(axis=1)
+                new_max = source_max[done * group:available * group].reshape(-1, group, self.channels).max(axis=1)
+                self.mins[level].extend(new_min)
+                self.maxs[level].extend(new_max)
+            source_min = self.mins[level].view()
+            source_max = self.maxs[level].view()
+            source_count = len(source_min)
+            group = self.fanout
+            level += 1
+
+    def _tail(self, level):
+        # min/max over the samples not yet covered by a complete bucket at `level`
+        # (reads at most fanout buckets per level below it plus < base_block raw samples)
+        if level < 0:
+            return None
+        complete = self.mins[level].count if level < len(self.mins) else 0
+        if level == 0:
+            tail = self.raw()[complete * self.base_block:self.sample_count]
+            if len(tail) == 0:
+                return None
+            return tail.min(axis=0), tail.max(axis=0)
+        below_min = self.mins[level - 1].view()[complete * self.fanout:]
+        below_max = self.maxs[level - 1].view()[complete * self.fanout:]
+        parts = [] if len(below_min) == 0 else [(below_min.min(axis=0), below_max.max(axis=0))]
+        tail = self._tail(level - 1)
+        if tail is not None:
+            parts.append(tail)
+        if not parts:
+            return None
+        return np.min([p[0] for p in parts], axis=0), np.max([p[1] for p in parts], axis=0)
+
+    def choose_level(self, span, max_points):
+        # Coarsest detail that still gives at most max_points buckets; -1 means raw samples
+        if span <= max_points:
+            return -1
+        level = 0
+        while level < len(self.mins) - 1 and span / self.block_size(level) > max_points:
+            level += 1
+        return level
+
+    def query(self, start, end, max_points=1000):
+        # Returns (x_seconds, mins, maxs) with mins/maxs shaped (points, channels) for samples [start, end)
+        start = max(0, int(start))
+        end = min(self.sample_count, int(np.ceil(end)))
+        if end <= start:
+            empty = np.zeros((0, self.channels), dtype=self.dtype)
+            return np.zeros(0), empty, empty
+        level = self.choose_level(end - start, max_points)
+        if level < 0 or not self.mins:
+            values = np.asarray(self.raw()[start:end])
+            return np.arange(start, end) / self.sample_rate, values, values
+
+        block = self.block_size(level)
+        first = start // block
+        last = -(-end // block) # ceil
+        complete = self.mins[level].count
+        mins = self.mins[level].view()[first:min(last, complete)]
+        maxs = self.maxs[level].view()[first:min(last, complete)]
+        if last > complete:
+            tail = self._tail(level)
+            if tail is not None:
+                mins = np.vstack([mins, tail[0][None]])
+                maxs = np.vstack([maxs, tail[1][None]])
+        x = (first + np.arange(len(mins))) * block / self.sample_rate
+        return x, mins, maxs
+
+    def query_seconds(self, start_time, end_time, max_points=1000):
+        return self.query(start_time * self.sample_rate, end_time * self.sample_rate, max_points)
+
+    def save(self, path):
+        # Only the summary levels are stored; the raw samples already live in the recording
+        arrays = {'meta': np.array([self.channels, self.sample_rate, self.base_block, self.fanout, self.sample_count])}
+        for level in range(len(self.mins)):
+            arrays[f'min{level}'] = self.mins[level].view()
+            arrays[f'max{level}'] = self.maxs[level].view()
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path, raw):
+        # raw: the session's (samples, channels) EMG, e.g. SessionReader.emg (memory-mapped or chunked)
+        with np.load(path) as data:
+            channels, sample_rate, base_block, fanout, sample_count = (int(v) for v in data['meta'])
+            pyramid = cls(channels=channels, sample_rate=sample_rate, base_block=base_block, fanout=fanout, dtype=raw.dtype)
+            level = 0
+            while f'min{level}' in data:
+                for target, key in ((pyramid.mins, f'min{level}'), (pyramid.maxs, f'max{level}')):
+                    values = data[key]
+                    array = _GrowableArray(channels, raw.dtype, capacity=max(1, len(values)))
+                    array.extend(values)
+                    target.append(array)
+                level += 1
+        pyramid._attach(raw, sample_count)
+        return pyramid
+
+    @classmethod
+    def build(cls, raw, sample_rate=200, chunk_samples=200 * 600, **kwargs):
+        # Build from an existing (possibly memory-mapped) recording. Each pass only reads the
+        # samples that were added since the previous one, so memory stays bounded by one chunk.
+        pyramid = cls(channels=raw.shape[1], sample_rate=sample_rate, dtype=raw.dtype, **kwargs)
+        for end in range(chunk_samples, len(raw) + chunk_samples, chunk_samples):
+            pyramid._attach(raw, end)
+            pyramid._update_levels()
+        pyramid._attach(raw, len(raw))
+        return pyramid
+
+
+def session_pyramid(session, rebuild=False):
+    # Load the pyramid saved next to a recording, building (and saving) it if missing
+    path = os.path.join(session.path, PYRAMID_FILE)
+    if os.path.exists(path) and not rebuild:
+        pyramid = MinMaxPyramid.load(path, session.emg)
+        if pyramid.sample_count == session.sample_count:
+            return pyramid
+    pyramid = MinMaxPyramid.build(session.emg, sample_rate=session.sample_rate)
+    pyramid.save(path)
+    return pyramid
+
+
+def main():
+    from myo_recording import find_sessions, open_session
+    parser = argparse.ArgumentParser(description="Build the zoomable min/max history for recorded sessions")
+    parser.add_argument('path', help="session directory or a directory of sessions")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild even if an up to date pyramid exists")
+    args = parser.parse_args()
+    for session_path in find_sessions(args.path):
+        session = open_session(session_path)
+        pyramid = session_pyramid(session, rebuild=args.rebuild)
+        print(f"{session_path}: {pyramid.sample_count} samples, {len(pyramid.mins)} levels")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+import math
+import numpy as np
+
+# Streaming quantile sketches for EMG channels, in bounded memory.
+# ChannelSketch is a KLL sketch (Karnin, Lang, Liberty 2016) kept for all channels at once: every
+# channel receives the same number of values, so the compactor levels have identical shapes and
+# each level is one (channels, items) array. When a level overflows it is sorted along the items
+# axis and every other item (random offset per channel) is promoted to the next level with twice
+# the weight. Compaction is lazy (only once the whole sketch is full), so at k=200 a sketch holds
+# about 600 items per channel and grows only with log(samples / k): pushes and queries cost the
+# same after a minute or after ten hours (`python myo_bench.py quantiles`).
+# RecentQuantiles rotates two sketches to follow the recent signal for plot auto-scaling.
+
+DEFAULT_K = 200
+MIN_CAPACITY = 8 # smallest compactor, as in the DataSketches KLL
+SUMMARY_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+class ChannelSketch():
+    def __init__(self, channels=8, k=DEFAULT_K, seed=None):
+        self.channels = channels
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.size = 0 # items held per channel
+        self.levels = [np.zeros((self.channels, 0), dtype=np.float32)]
+        self._update_capacities()
+        self.minimum = np.full(self.channels, np.inf)
+        self.maximum = np.full(self.channels, -np.inf)
+
+    def _update_capacities(self):
+        # Lower levels get geometrically smaller buffers, the top level gets k
+        top = len(self.levels) - 1
+        self.capacities = [max(MIN_CAPACITY, math.ceil(self.k * (2 / 3) ** (top - level))) for level in range(top + 1)]
+        self.capacity = sum(self.capacities)
+
+    def _add_level(self):
+        self.levels.append(np.zeros((self.channels, 0), dtype=np.float32))
+        self._update_capacities()
+
+    def push(self, samples):
+        # samples: (n, channels)
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples) == 0:
+            return
+        self.count += len(samples)
+        self.minimum = np.minimum(self.minimum, samples.min(axis=0))
+        self.maximum = np.maximum(self.maximum, samples.max(axis=0))
+        self.levels[0] = np.concatenate([self.levels[0], samples.T], axis=1)
+        self.size += len(samples)
+        if self.size >= self.capacity:
+            self._compress()
+
+    def _compress(self):
+        # Lazy compaction: only when the whole sketch is full, compact the lowest overfull level.
+        # Pushes stay cheap however many levels there are.
+        while self.size >= self.capacity:
+            level = next(level for level, items in enumerate(self.levels) if items.shape[1] >= self.capacities[level])
+            if level + 1 == len(self.levels):
+                self._add_level()
+            # Compact an even number of items and keep the odd one out at this level
+            items = self.levels[level]
+            even = items.shape[1] - items.shape[1] % 2
+            compacting = np.sort(items[:, :even], axis=1)
+            offsets = self.rng.integers(0, 2, size=self.channels)
+            columns = offsets[:, None] + 2 * np.arange(even // 2)
+            self.levels[level] = items[:, even:]
+            self.size -= even // 2
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], np.take_along_axis(compacting, columns, axis=1)], axis=1)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        while len(self.levels) < len(other.levels):
+            self._add_level()
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items], axis=1)
+        self.count += other.count
+        self.size += other.size
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+        self._compress()
+
+    def _weighted_items(self):
+        values = np.concatenate(self.levels, axis=1)
+        weights = np.concatenate([np.full(items.shape[1], 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, axis=1, kind='stable')
+        return np.take_along_axis(values, order, axis=1), np.cumsum(weights[order], axis=1)
+
+    def quantiles(self, q):
+        # q: fractions in [0, 1]; returns (channels, len(q)), NaN before any data
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.count == 0:
+            return np.full((self.channels, len(q)), np.nan)
+        values, cumulative = self._weighted_items()
+        total = cumulative[:, -1:]
+        result = np.empty((self.channels, len(q)))
+        for column, fraction in enumerate(q):
+            index = np.minimum((cumulative < fraction * total).sum(axis=1), values.shape[1] - 1)
+            result[:, column] = values[np.arange(self.channels), index]
+        # The extremes are tracked exactly
+        result[:, q <= 0] = self.minimum[:, None]
+        result[:, q >= 1] = self.maximum[:, None]
+        return result
+
+    def percentiles(self, p):
+        return self.quantiles(np.asarray(p, dtype=np.float64) / 100)
+
+    def summary(self, percentiles=SUMMARY_PERCENTILES):
+        # JSON-friendly per-channel percentile summary
+        values = self.percentiles(percentiles)
+        summary = {f"p{p:g}": values[:, i].tolist() for i, p in enumerate(percentiles)}
+        summary['min'] = self.minimum.tolist() if self.count else []
+        summary['max'] = self.maximum.tolist() if self.count else []
+        summary['count'] = int(self.count)
+        return summary
+
+
+class RecentQuantiles():
+    # Quantiles over roughly the last one to two windows: one sketch fills while the previous
+    # full one is kept, and queries merge both. The merged sketch is kept until the next push.
+    def __init__(self, channels=8, sample_rate=200, window_seconds=10, k=DEFAULT_K):
+        self.channels = channels
+        self.window = max(1, int(window_seconds * sample_rate))
+        self.k = k
+        self.current = ChannelSketch(channels, k)
+        self.previous = None
+        self._merged = None
+
+    def reset(self):
+        self.current = ChannelSketch(self.channels, self.k)
+        self.previous = None
+        self._merged = None
+
+    def push(self, samples):
+        if len(samples) == 0:
+            return
+        self.current.push(samples)
+        self._merged = None
+        if self.current.count >= self.window:
+            self.previous = self.current
+            self.current = ChannelSketch(self.channels, self.k)
+
+    @property
+    def count(self):
+        return self.current.count + (self.previous.count if self.previous is not None else 0)
+
+    def quantiles(self, q):
+        if self.previous is None:
+            return self.current.quantiles(q)
+        if self._merged is None:
+            self._merged = ChannelSketch(self.channels, self.k)
+            self._merged.merge(self.previous)
+            self._merged.merge(self.current)
+        return self._merged.quantiles(q)
+
+
+def axis_limits(low, high, margin=0.1, min_span=10.0):
+    # Padded y-axis limits from per-channel low/high quantiles, never narrower than min_span
+    center = (low + high) / 2
+    half_span = np.maximum((high - low) * (1 + 2 * margin), min_span) / 2
+    return center - half_span, center + half_span
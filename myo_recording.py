@@ -0,0 +1,191 @@
+import json, os, time
+import numpy as np
+from myo_quantiles import ChannelSketch
+
+# A recorded session is a directory:
+#   meta.json         device and format information
+#   emg.bin           int8 samples, row-major (samples, channels)
+#   timestamps.bin    float64 seconds since the first recorded sample
+#   events.jsonl      classifier/battery/... events, one JSON object per line
+# When the session is closed, meta.json gains per-channel percentiles from a streaming sketch.
+# Sessions recorded with "storage": "compressed" in meta.json keep the samples in compressed
+# chunks instead (see myo_compressed.py); open_session() picks the right reader.
+# The binary files are append-only so a crash loses at most the unflushed tail, and readers
+# memory-map them so offline tools never need the whole session in RAM.
+
+FORMAT_VERSION = 1
+EMG_FILE = 'emg.bin'
+TIMESTAMPS_FILE = 'timestamps.bin'
+EVENTS_FILE = 'events.jsonl'
+META_FILE = 'meta.json'
+
+
+def new_session_path(directory, prefix='session'):
+    return os.path.join(directory, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+
+class SessionRecorder():
+    def __init__(self, path, channels=8, sample_rate=200, device_uuid='', serial_number='', calibration=None):
+        self.path = path
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.meta = {
+            'format_version': FORMAT_VERSION,
+            'channels': channels,
+            'sample_rate': sample_rate,
+            'emg_dtype': 'int8',
+            'timestamp_dtype': 'float64',
+            'device_uuid': device_uuid,
+            'serial_number': serial_number,
+            'started': time.time(),
+        }
+        if calibration is not None:
+            self.meta['calibration'] = calibration # as used live, so offline tools can reproduce it
+        self.sample_count = 0
+        self.time_origin = None
+        self.last_timestamp = 0.0
+        self.sketch = ChannelSketch(channels)
+
+        os.makedirs(path, exist_ok=True)
+        self._open_storage()
+        self._events_file = open(os.path.join(path, EVENTS_FILE), 'a')
+        self._write_meta()
+
+    def _open_storage(self):
+        self._emg_file = open(os.path.join(self.path, EMG_FILE), 'ab')
+        self._timestamps_file = open(os.path.join(self.path, TIMESTAMPS_FILE), 'ab')
+
+    def _write_samples(self, timestamps, samples):
+        # timestamps relative to the first sample, samples int8
+        self._emg_file.write(samples.tobytes())
+        self._timestamps_file.write(timestamps.tobytes())
+
+    def _flush_storage(self):
+        self._emg_file.flush()
+        self._timestamps_file.flush()
+
+    def _close_storage(self):
+        self._emg_file.close()
+        self._timestamps_file.close()
+
+    def _write_meta(self):
+        tmp_path = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    @property
+    def closed(self):
+        return self._events_file.closed
+
+    def write(self, timestamps, samples):
+        # timestamps: (n,) seconds on any monotonic clock, samples: (n, channels)
+        if self.closed or len(samples) == 0:
+            return
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if self.time_origin is None:
+            self.time_origin = float(timestamps[0])
+        self._write_samples(timestamps - self.time_origin, np.ascontiguousarray(samples, dtype=np.int8))
+        self.sketch.push(samples)
+        self.sample_count += len(samples)
+        self.last_timestamp = float(timestamps[-1]) - self.time_origin
+
+    def record_event(self, kind, **fields):
+        if self.closed:
+            return
+        event = {'t': self.last_timestamp, 'sample': self.sample_count, 'type': kind}
+        event.update(fields)
+        self._events_file.write(json.dumps(event) + '\n')
+
+    def copy_event(self, event):
+        # Append an event read from another session as is, keeping its original 't' and 'sample'
+        if self.closed:
+            return
+        self._events_file.write(json.dumps(event) + '\n')
+
+    def flush(self):
+        if not self.closed:
+            self._flush_storage()
+            self._events_file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self._close_storage()
+        self._events_file.close()
+        self.meta['stopped'] = time.time()
+        self.meta['sample_count'] = self.sample_count
+        self.meta['percentiles'] = self.sketch.summary()
+        self._write_meta()
+
+
+class SessionReader():
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        self.channels = self.meta['channels']
+        self.sample_rate = self.meta['sample_rate']
+        self._open_storage()
+
+    def _open_storage(self):
+        path = self.path
+        # Trust the file sizes over meta.json so sessions that were never closed cleanly still open
+        emg_path = os.path.join(path, EMG_FILE)
+        timestamps_path = os.path.join(path, TIMESTAMPS_FILE)
+        self.sample_count = min(os.path.getsize(emg_path) // self.channels, os.path.getsize(timestamps_path) // 8)
+        if self.sample_count:
+            self.emg = np.memmap(emg_path, dtype=np.int8, mode='r', shape=(self.sample_count, self.channels))
+            self.timestamps = np.memmap(timestamps_path, dtype=np.float64, mode='r', shape=(self.sample_count,))
+        else:
+            self.emg = np.zeros((0, self.channels), dtype=np.int8)
+            self.timestamps = np.zeros(0, dtype=np.float64)
+
+    @property
+    def duration(self):
+        return float(self.timestamps[-1]) if self.sample_count else 0.0
+
+    def index_range(self, start=None, end=None):
+        # Sample index range [i0, i1) covering session time [start, end) in seconds
+        i0 = 0 if start is None else int(np.searchsorted(self.timestamps, start, side='left'))
+        i1 = self.sample_count if end is None else int(np.searchsorted(self.timestamps, end, side='left'))
+        return i0, max(i0, i1)
+
+    def events(self, kinds=None):
+        events_path = os.path.join(self.path, EVENTS_FILE)
+        if not os.path.exists(events_path):
+            return
+        with open(events_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                event = json.loads(line)
+                if kinds is None or event['type'] in kinds:
+                    yield event
+
+
+def is_session(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def find_sessions(directory):
+    # Every session directory below `directory` (or `directory` itself), sorted by path
+    if is_session(directory):
+        return [directory]
+    sessions = []
+    for root, dirs, files in os.walk(directory):
+        if META_FILE in files:
+            sessions.append(root)
+            dirs[:] = []
+    return sorted(sessions)
+
+
+def open_session(path):
+    # Reader for either storage format
+    with open(os.path.join(path, META_FILE), 'r') as f:
+        storage = json.load(f).get('storage', 'raw')
+    if storage == 'compressed':
+        from myo_compressed import CompressedSessionReader
+        return CompressedSessionReader(path)
+    return SessionReader(path)
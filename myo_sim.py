@@ -0,0 +1,60 @@
+import numpy as np
+from myo_protocol import EMG_HANDLES, SAMPLE_RATE, SAMPLES_PER_PACKET
+
+# Simulated Myo that produces EMG notifications in the same wire format as the real armband:
+# 16 signed bytes (2 samples x 8 channels) per notification, rotating over the four EMG
+# characteristic handles, 100 notifications per second. Muscle bursts can be scheduled at known
+# times so detectors can be checked against ground truth without hardware.
+
+
+class SimulatedMyo():
+    def __init__(self, channels=8, noise_level=3.0, seed=0):
+        self.channels = channels
+        self.noise_level = noise_level
+        self.rng = np.random.default_rng(seed)
+        self.bursts = [] # (start_sample, end_sample, channels, amplitude)
+
+    def add_burst(self, start, duration, channels, amplitude=40.0):
+        # start/duration in seconds
+        start_sample = int(round(start * SAMPLE_RATE))
+        self.bursts.append((start_sample, start_sample + int(round(duration * SAMPLE_RATE)), tuple(channels), amplitude))
+
+    def add_random_bursts(self, seconds, count, min_gap=1.0, duration=(0.3, 1.0), amplitude=(25.0, 60.0)):
+        # Evenly spread, non-overlapping bursts on random channel groups
+        spacing = seconds / (count + 1)
+        for i in range(count):
+            length = self.rng.uniform(*duration)
+            start = (i + 1) * spacing + self.rng.uniform(-0.25, 0.25) * max(0.0, spacing - length - min_gap)
+            channels = self.rng.choice(self.channels, size=self.rng.integers(1, 4), replace=False)
+            self.add_burst(start, length, channels, self.rng.uniform(*amplitude))
+
+    def samples(self, seconds):
+        count = int(seconds * SAMPLE_RATE)
+        emg = self.rng.normal(0, self.noise_level, size=(count, self.channels))
+        for start, end, channels, amplitude in self.bursts:
+            if start >= count:
+                continue
+            end = min(end, count)
+            # Band-limited-ish burst with a short ramp so the onset isn't a perfect step
+            ramp = np.minimum(1.0, np.arange(end - start) / (0.02 * SAMPLE_RATE) + 0.1)
+            for channel in channels:
+                emg[start:end, channel] += self.rng.normal(0, amplitude, size=end - start) * ramp
+        return np.clip(np.round(emg), -128, 127).astype(np.int8)
+
+    def packets(self, seconds):
+        # Yields (handle, data) notifications in order
+        emg = self.samples(seconds)
+        for i, start in enumerate(range(0, len(emg) - SAMPLES_PER_PACKET + 1, SAMPLES_PER_PACKET)):
+            yield EMG_HANDLES[i % len(EMG_HANDLES)], bytearray(emg[start:start + SAMPLES_PER_PACKET].tobytes())
+
+    async def stream(self, callback, seconds, speed=1.0):
+        # Calls callback(handle, data) like Bleak's start_notify, paced in real time (speed > 1 replays faster)
+        import asyncio
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for i, (handle, data) in enumerate(self.packets(seconds)):
+            due = start + i * SAMPLES_PER_PACKET / SAMPLE_RATE / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            callback(handle, data)
@@ -0,0 +1,95 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Incremental short-time spectrum of the EMG channels.
+# New samples are appended to a small staging buffer; as soon as one or more hops are
+# available, every pending frame for every channel is windowed and transformed in a single
+# batched rFFT. Nothing is ever recomputed over the whole plot window.
+
+
+class StreamingSpectrum():
+    def __init__(self, channels=8, sample_rate=200, frame_size=128, hop_size=16, history_frames=250, psd_smoothing=0.9):
+        if hop_size > frame_size:
+            raise ValueError("hop_size must not be larger than frame_size")
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.history_frames = history_frames
+        self.psd_smoothing = psd_smoothing
+
+        self.window = np.hanning(frame_size).astype(np.float32)
+        # One-sided PSD scaling (same convention as scipy.signal.welch with scaling='density')
+        self.psd_scale = np.full(frame_size // 2 + 1, 2.0 / (sample_rate * float(np.sum(self.window ** 2))), dtype=np.float32)
+        self.psd_scale[0] /= 2
+        if frame_size % 2 == 0:
+            self.psd_scale[-1] /= 2
+        self.frequencies = np.fft.rfftfreq(frame_size, d=1.0 / sample_rate)
+        self.bins = len(self.frequencies)
+
+        self._buffer = np.zeros((frame_size * 4, channels), dtype=np.float32)
+        self._fill = 0
+
+        self.psd = np.zeros((channels, self.bins), dtype=np.float32)
+        self.spectrogram = np.full((channels, history_frames, self.bins), -60.0, dtype=np.float32) # dB ring buffer
+        self.spectrogram_index = 0 # next row to write
+        self.frames_computed = 0
+
+    def reset(self):
+        self._fill = 0
+        self.psd[:] = 0
+        self.spectrogram[:] = -60.0
+        self.spectrogram_index = 0
+        self.frames_computed = 0
+
+    def push(self, samples):
+        # samples: (n, channels). Returns the number of new frames computed.
+        samples = np.asarray(samples, dtype=np.float32)
+        n = len(samples)
+        if n == 0:
+            return 0
+        if self._fill + n > len(self._buffer):
+            grown = np.zeros((max(2 * len(self._buffer), self._fill + n), self.channels), dtype=np.float32)
+            grown[:self._fill] = self._buffer[:self._fill]
+            self._buffer = grown
+        self._buffer[self._fill:self._fill + n] = samples
+        self._fill += n
+
+        if self._fill < self.frame_size:
+            return 0
+        frame_count = 1 + (self._fill - self.frame_size) // self.hop_size
+        frames = sliding_window_view(self._buffer[:self._fill], self.frame_size, axis=0)[::self.hop_size][:frame_count] # (frames, channels, frame_size)
+        self._process_frames(frames)
+
+        # Keep only what the next frame still needs
+        consumed = frame_count * self.hop_size
+        remaining = self._fill - consumed
+        self._buffer[:remaining] = self._buffer[consumed:self._fill]
+        self._fill = remaining
+        return frame_count
+
+    def _process_frames(self, frames):
+        frames = frames - frames.mean(axis=-1, keepdims=True) # remove per-frame DC so it doesn't swamp bin 0
+        spectra = np.fft.rfft(frames * self.window, axis=-1)
+        power = (spectra.real ** 2 + spectra.imag ** 2).astype(np.float32) * self.psd_scale # (frames, channels, bins)
+
+        # Exponentially averaged PSD, applied frame by frame in closed form
+        frame_count = len(power)
+        decay = self.psd_smoothing ** np.arange(frame_count - 1, -1, -1, dtype=np.float32)
+        self.psd = (self.psd_smoothing ** frame_count) * self.psd + (1 - self.psd_smoothing) * np.tensordot(decay, power, axes=1)
+
+        power_db = 10 * np.log10(power[-self.history_frames:] + 1e-6).transpose(1, 0, 2) # (channels, frames, bins)
+        kept = power_db.shape[1]
+        rows = (self.spectrogram_index + frame_count - kept + np.arange(kept)) % self.history_frames
+        self.spectrogram[:, rows, :] = power_db
+        self.spectrogram_index = (self.spectrogram_index + frame_count) % self.history_frames
+        self.frames_computed += frame_count
+
+    def psd_db(self):
+        return 10 * np.log10(self.psd + 1e-6)
+
+    def spectrogram_image(self, channel):
+        # (bins, history) with the highest frequency in the first row and the newest frame on the right,
+        # which is the row-major layout DearPyGui's heat series expects
+        ordered = np.roll(self.spectrogram[channel], -self.spectrogram_index, axis=0)
+        return ordered.T[::-1]
@@ -0,0 +1,199 @@
+import inspect
+from collections import deque, namedtuple
+import numpy as np
+
+# Public subscription API for decoded Myo data.
+# Producers call StreamHub.publish(stream, timestamps, data) once per batch; every subscriber
+# of that stream gets the same Batch in its own bounded queue and is fed by its own task, so a
+# slow or failing handler only ever loses its own batches and never blocks ingest or the other
+# subscribers. publish() is O(subscribers) appends and must be called from the event loop thread.
+#
+# Streams and their batch layout (timestamps are always (n,) float64 seconds):
+#   emg          (n, 8) int8 samples
+#   imu          (n, 10) int16: orientation quaternion w, x, y, z, accelerometer x, y, z, gyroscope x, y, z
+#   classifier   (n,) CLASSIFIER_DTYPE records
+#   battery      (n,) uint8 percent
+#   rssi         (n,) int16 dBm
+#   onset        (n,) ONSET_DTYPE records from myo_onset
+#   correlation  (n, channels, channels) float64 from myo_correlation
+#   gesture      (n,) CLASSIFIER_DTYPE 'POSE' records of custom gestures from myo_gestures
+# Batches are shared between subscribers, so their arrays are read-only views.
+# asyncio is imported by the first subscription: publishing to a hub nobody listens to, e.g. in
+# an offline tool, doesn't pay for loading it.
+
+STREAMS = ('emg', 'imu', 'classifier', 'battery', 'rssi', 'onset', 'correlation', 'gesture')
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest')
+DEFAULT_MAXSIZE = 256
+
+CLASSIFIER_DTYPE = np.dtype([('event', 'U16'), ('value', 'U16'), ('x_direction', 'U16')])
+ONSET_DTYPE = np.dtype([('kind', 'U8'), ('channel', np.int32), ('sample', np.int64), ('envelope', np.float64)])
+
+Batch = namedtuple('Batch', ['stream', 'timestamps', 'data'])
+
+
+def _read_only(array):
+    view = np.asarray(array).view()
+    view.flags.writeable = False
+    return view
+
+
+def concatenate_batches(batches):
+    if len(batches) == 1:
+        return batches[0]
+    return Batch(batches[0].stream,
+                 _read_only(np.concatenate([batch.timestamps for batch in batches])),
+                 _read_only(np.concatenate([batch.data for batch in batches])))
+
+
+class Subscription():
+    def __init__(self, hub, stream, handler=None, maxsize=DEFAULT_MAXSIZE, overflow='drop_oldest', coalesce=False,
+                 threaded=False, name=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}, expected one of {', '.join(OVERFLOW_POLICIES)}")
+        self.hub = hub
+        self.stream = stream
+        self.handler = handler
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.coalesce = coalesce # hand everything queued to the handler as one concatenated batch
+        self.threaded = threaded # run a blocking sync handler in the default executor
+        self.name = name or getattr(handler, '__qualname__', None) or 'pull'
+        self.queue = deque()
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.closed = False
+        self.dropped_counter = None
+        import asyncio
+        self._ready = asyncio.Event()
+        self._task = None
+
+    def offer(self, batch):
+        if self.closed:
+            return
+        if len(self.queue) >= self.maxsize:
+            self.dropped += 1
+            if self.dropped_counter is not None:
+                self.dropped_counter.inc()
+            if self.overflow == 'drop_newest':
+                return
+            self.queue.popleft()
+        self.queue.append(batch)
+        self._ready.set()
+        if self.handler is not None and self._task is None:
+            import asyncio
+            self._task = asyncio.get_running_loop().create_task(self._deliver())
+
+    def _take(self):
+        if self.coalesce and len(self.queue) > 1:
+            batches = list(self.queue)
+            self.queue.clear()
+            return concatenate_batches(batches)
+        return self.queue.popleft()
+
+    async def get(self):
+        # Next batch for pull-style subscribers (handler=None), or None once closed
+        while not self.queue:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._take()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        batch = await self.get()
+        if batch is None:
+            raise StopAsyncIteration
+        return batch
+
+    async def _deliver(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        is_coroutine = inspect.iscoroutinefunction(self.handler)
+        while True:
+            batch = await self.get()
+            if batch is None:
+                return
+            try:
+                if is_coroutine:
+                    await self.handler(batch)
+                elif self.threaded:
+                    await loop.run_in_executor(None, self.handler, batch)
+                else:
+                    # Nothing can be queued while a sync handler runs, so draining the queue
+                    # without yielding is bounded by maxsize
+                    self.handler(batch)
+                self.delivered += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Subscriber {self.name} on '{self.stream}' failed: {e!r}")
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        self._ready.set()
+        self.hub._remove(self)
+
+    def stats(self):
+        return {'stream': self.stream, 'name': self.name, 'queued': len(self.queue), 'delivered': self.delivered,
+                'dropped': self.dropped, 'errors': self.errors}
+
+
+class StreamHub():
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self.subscriptions = {}
+
+    def subscribe(self, stream, handler=None, maxsize=DEFAULT_MAXSIZE, overflow='drop_oldest', coalesce=False,
+                  threaded=False, name=None):
+        # handler(batch) may be a plain function or a coroutine function; without a handler, read
+        # batches with `await subscription.get()` or `async for batch in subscription`
+        if stream not in STREAMS:
+            raise ValueError(f"Unknown stream {stream}, expected one of {', '.join(STREAMS)}")
+        subscription = Subscription(self, stream, handler, maxsize=maxsize, overflow=overflow, coalesce=coalesce,
+                                    threaded=threaded, name=name)
+        if self.metrics is not None:
+            subscription.dropped_counter = self.metrics.subscriber_dropped.labels(stream)
+        # Copy on write so publish() can iterate without holding a reference to a list being changed
+        self.subscriptions[stream] = self.subscriptions.get(stream, ()) + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+
+    def _remove(self, subscription):
+        remaining = tuple(s for s in self.subscriptions.get(subscription.stream, ()) if s is not subscription)
+        if remaining:
+            self.subscriptions[subscription.stream] = remaining
+        else:
+            self.subscriptions.pop(subscription.stream, None)
+
+    def has_subscribers(self, stream):
+        return stream in self.subscriptions
+
+    def publish(self, stream, timestamps, data):
+        subscriptions = self.subscriptions.get(stream)
+        if not subscriptions:
+            return
+        batch = Batch(stream, _read_only(np.asarray(timestamps, dtype=np.float64)), _read_only(data))
+        for subscription in subscriptions:
+            subscription.offer(batch)
+
+    def stats(self):
+        return [subscription.stats() for subscriptions in self.subscriptions.values() for subscription in subscriptions]
+
+    def close(self):
+        for subscriptions in list(self.subscriptions.values()):
+            for subscription in subscriptions:
+                subscription.close()
+
+
+def classifier_record(event, value=None, x_direction=None):
+    return np.array([(event, value or '', x_direction or '')], dtype=CLASSIFIER_DTYPE)
+
+
+def onset_records(events):
+    return np.array([(event.kind, event.channel, event.sample, event.envelope) for event in events], dtype=ONSET_DTYPE)